@@ -7,7 +7,7 @@ if [ -d "venv" ]; then
   echo "✅ Virtual environment activated."
 fi
 
-rm -f queuectl.db
+rm -f queuectl.db queuectl.db-* queuectl.db.*
 echo "🧹 Old database removed."
 
 python -m src.cli init
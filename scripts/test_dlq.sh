@@ -17,7 +17,7 @@ else
 fi
 
 # Clean up old DB
-rm -f queuectl.db
+rm -f queuectl.db queuectl.db-* queuectl.db.*
 echo "🧹 Old database removed (if any)."
 
 # Initialize new DB
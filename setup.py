@@ -5,6 +5,9 @@ setup(
     version="1.0.0",
     packages=find_packages(),
     install_requires=["click", "tabulate"],
+    extras_require={
+        "fast": ["orjson", "fastjsonschema"],
+    },
     entry_points={
         "console_scripts": ["queuectl=src.cli:cli"]
     },
@@ -0,0 +1,44 @@
+"""
+Plain-text table formatting for CLI output.
+"""
+
+from typing import Any, List, Sequence
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def simple_table(rows: Sequence[Sequence[Any]], headers: Sequence[str]) -> str:
+    """
+    Render rows as a fixed-width table in tabulate's "simple" layout.
+
+    Numeric columns are right-aligned, everything else is left-aligned,
+    and None renders as an empty cell.
+
+    Args:
+        rows: Table rows, one value per column
+        headers: Column headers
+
+    Returns:
+        The formatted table
+    """
+    cells = [["" if value is None else str(value) for value in row] for row in rows]
+
+    widths: List[int] = []
+    numeric: List[bool] = []
+    for i, header in enumerate(headers):
+        values = [row[i] for row in rows if row[i] is not None]
+        numeric.append(bool(values) and all(_is_number(v) for v in values))
+        widths.append(max([len(header) + 2] + [len(row[i]) for row in cells]))
+
+    def fmt(row: Sequence[str]) -> str:
+        line = "  ".join(
+            f"{c:>{w}}" if num else f"{c:<{w}}"
+            for c, w, num in zip(row, widths, numeric)
+        )
+        return line.rstrip()
+
+    lines = [fmt(headers), "  ".join("-" * w for w in widths)]
+    lines.extend(fmt(row) for row in cells)
+    return "\n".join(lines)
@@ -6,15 +6,50 @@ import click
 import json
 import sys
 from pathlib import Path
-from tabulate import tabulate
-from .storage import Storage
-from .worker import WorkerManager
-from .config import Config
-from .utils import setup_logging
+from typing import Optional
+from .utils import setup_logging, json_loads
+from ._fmt import simple_table
 import logging
 
+try:
+    import fastjsonschema
+except ImportError:  # optional: pip install queuectl[fast]
+    fastjsonschema = None
+
 logger = logging.getLogger(__name__)
 
+# Job files at least this large are memory-mapped rather than read
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+JOB_SCHEMA = {
+    "type": "object",
+    "required": ["id", "command"],
+    "properties": {
+        "max_retries": {"type": "integer", "minimum": 0},
+        "shell": {"type": ["boolean", "null"]},
+    },
+}
+
+_job_validator = None
+
+
+def _load_job_file(path):
+    """
+    Parse a job JSON file from raw bytes, skipping text-mode decoding.
+    
+    Files of MMAP_THRESHOLD bytes or more are memory-mapped instead of
+    read into a separate buffer.
+    """
+    path = Path(path)
+    if path.stat().st_size < MMAP_THRESHOLD:
+        return json_loads(path.read_bytes())
+    
+    import mmap
+    
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return json_loads(view)
+
 
 @click.group()
 @click.option('--db', default='queuectl.db', help='Database file path')
@@ -25,16 +60,41 @@ def cli(ctx, db, log_level):
     ctx.ensure_object(dict)
     ctx.obj['db_path'] = db
     ctx.obj['log_level'] = log_level
+    ctx.obj['_storage'] = None
     setup_logging(log_level)
 
 
+def _get_storage(ctx, bootstrap: bool = False):
+    """
+    Return the invocation's Storage, creating it on first use.
+    
+    Args:
+        bootstrap: Create or migrate the schema first. Only init, enqueue
+            and worker start need this; other commands open the database
+            as-is.
+    """
+    from .storage import Storage
+    
+    if ctx.obj.get('_storage') is None:
+        db_path = ctx.obj['db_path']
+        if bootstrap:
+            storage = Storage.bootstrap(db_path)
+        elif not Path(db_path).exists():
+            click.echo(f"✗ Database {db_path} not found; run 'queuectl init' first", err=True)
+            sys.exit(1)
+        else:
+            storage = Storage(db_path)
+        ctx.obj['_storage'] = storage
+        ctx.call_on_close(storage.close)
+    return ctx.obj['_storage']
+
+
 @cli.command()
 @click.pass_context
 def init(ctx):
     """Initialize the database"""
     db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
-    storage.init_db()
+    _get_storage(ctx, bootstrap=True)
     click.echo(f"✓ Database initialized: {db_path}")
 
 
@@ -43,44 +103,54 @@ def init(ctx):
 @click.option('--file', '-f', type=click.Path(exists=True), help='Job JSON file')
 @click.pass_context
 def enqueue(ctx, job_json, file):
-    """Enqueue a job from JSON string or file"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
-    config = Config(storage)
+    """Enqueue a job (or a JSON array of jobs) from JSON string or file"""
+    from .config import Config
+    
+    storage = _get_storage(ctx, bootstrap=True)
+    config = Config(storage, keys=['max_retries'])
     
     # Load job data
-    if file:
-        with open(file, 'r') as f:
-            job_data = json.load(f)
-    elif job_json:
-        try:
-            job_data = json.loads(job_json)
-        except json.JSONDecodeError as e:
-            click.echo(f"✗ Invalid JSON: {e}", err=True)
-            sys.exit(1)
-    else:
+    if not file and not job_json:
         click.echo("✗ Provide either job JSON string or --file option", err=True)
         sys.exit(1)
     
-    # Validate required fields
-    if 'id' not in job_data:
-        click.echo("✗ Job must have 'id' field", err=True)
+    try:
+        job_data = _load_job_file(file) if file else json_loads(job_json)
+    except json.JSONDecodeError as e:
+        click.echo(f"✗ Invalid JSON: {e}", err=True)
         sys.exit(1)
     
-    if 'command' not in job_data:
-        click.echo("✗ Job must have 'command' field", err=True)
+    jobs = job_data if isinstance(job_data, list) else [job_data]
+    if not jobs:
+        click.echo("✗ No jobs to enqueue", err=True)
         sys.exit(1)
     
-    # Apply defaults from config
-    if 'max_retries' not in job_data:
-        job_data['max_retries'] = config.get_int('max_retries', 3)
+    # Read the config default once for the whole batch
+    default_max_retries = config.get_int('max_retries', 3)
     
-    # Validate max_retries
-    if not isinstance(job_data['max_retries'], int) or job_data['max_retries'] < 0:
-        click.echo("✗ max_retries must be a non-negative integer", err=True)
-        sys.exit(1)
+    for job in jobs:
+        # Apply defaults from config
+        if isinstance(job, dict) and 'max_retries' not in job:
+            job['max_retries'] = default_max_retries
+        
+        error = _validate_job(job)
+        if error:
+            click.echo(f"✗ {error}", err=True)
+            sys.exit(1)
+    
+    if len(jobs) > 1:
+        # Bulk path: one transaction for the whole batch
+        success = storage.enqueue_jobs_bulk(jobs)
+        
+        if success:
+            click.echo(f"✓ {len(jobs)} jobs enqueued")
+        else:
+            click.echo("✗ Failed to enqueue jobs: a job ID already exists (nothing enqueued)", err=True)
+            sys.exit(1)
+        return
     
     # Enqueue the job
+    job_data = jobs[0]
     success = storage.enqueue_job(job_data)
     
     if success:
@@ -92,6 +162,49 @@ def enqueue(ctx, job_json, file):
         sys.exit(1)
 
 
+def _validate_job(job_data) -> Optional[str]:
+    """
+    Return an error message if the job is invalid, else None.
+    
+    Both validation paths accept the same input: max_retries may be an
+    integral float (e.g. 2.0), which is normalized to int in place, but
+    never a boolean.
+    """
+    global _job_validator
+    
+    if fastjsonschema is not None:
+        # Compiled on first use so commands that never validate skip the codegen
+        if _job_validator is None:
+            _job_validator = fastjsonschema.compile(JOB_SCHEMA)
+        try:
+            _job_validator(job_data)
+        except fastjsonschema.JsonSchemaException as e:
+            return e.message
+        job_data['max_retries'] = int(job_data['max_retries'])
+        return None
+    
+    if not isinstance(job_data, dict):
+        return "Job must be a JSON object"
+    
+    if 'id' not in job_data:
+        return "Job must have 'id' field"
+    
+    if 'command' not in job_data:
+        return "Job must have 'command' field"
+    
+    max_retries = job_data['max_retries']
+    if (isinstance(max_retries, bool) or not isinstance(max_retries, (int, float))
+            or (isinstance(max_retries, float) and not max_retries.is_integer())
+            or max_retries < 0):
+        return "max_retries must be a non-negative integer"
+    job_data['max_retries'] = int(max_retries)
+    
+    if job_data.get('shell') is not None and not isinstance(job_data['shell'], bool):
+        return "shell must be true or false"
+    
+    return None
+
+
 @cli.group()
 def worker():
     """Worker management commands"""
@@ -99,15 +212,18 @@ def worker():
 
 
 @worker.command()
-@click.option('--count', default=1, help='Number of worker processes')
+@click.option('--count', default=None, type=int, help='Number of worker processes')
 @click.option('--base', default=None, type=int, help='Backoff base for retries')
 @click.option('--limit', default=None, type=int, help='Max jobs to process (for testing)')
 @click.pass_context
 def start(ctx, count, base, limit):
     """Start worker processes"""
+    from .config import Config
+    from .worker import WorkerManager
+    
     db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
-    config = Config(storage)
+    storage = _get_storage(ctx, bootstrap=True)
+    config = Config(storage, keys=['backoff_base', 'worker_default_count'])
     
     # Apply config defaults if not provided
     if base is None:
@@ -116,6 +232,10 @@ def start(ctx, count, base, limit):
     if count is None:
         count = config.get_int('worker_default_count', 1)
     
+    # SQLite connections must not cross fork(): release ours before the
+    # manager forks workers
+    storage.close()
+    
     click.echo(f"Starting {count} worker(s)...")
     click.echo(f"  Database: {db_path}")
     click.echo(f"  Backoff base: {base}")
@@ -136,8 +256,6 @@ def start(ctx, count, base, limit):
 @click.pass_context
 def stop(ctx):
     """Stop all workers"""
-    db_path = ctx.obj['db_path']
-    
     # Read PID file and send signal
     pidfile = Path('.queuectl.pid')
     if not pidfile.exists():
@@ -151,6 +269,22 @@ def stop(ctx):
         with open(pidfile, 'r') as f:
             pid = int(f.read().strip())
         
+        # Never signal a PID that died or was reused by another program
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            pidfile.unlink(missing_ok=True)
+            click.echo(f"✗ No workers running (removed stale PID file for PID {pid})", err=True)
+            sys.exit(1)
+        
+        if not _is_queuectl_process(pid):
+            pidfile.unlink(missing_ok=True)
+            click.echo(
+                f"✗ PID {pid} is not a queuectl process (removed stale PID file)",
+                err=True
+            )
+            sys.exit(1)
+        
         os.kill(pid, signal.SIGTERM)
         click.echo(f"✓ Sent stop signal to worker manager (PID: {pid})")
         
@@ -159,12 +293,27 @@ def stop(ctx):
         sys.exit(1)
 
 
+def _is_queuectl_process(pid: int) -> bool:
+    """
+    Check that a live PID looks like a queuectl worker manager.
+    
+    Uses /proc/<pid>/comm where available (Linux); elsewhere the PID
+    is trusted.
+    """
+    try:
+        comm = Path(f'/proc/{pid}/comm').read_text().strip()
+    except FileNotFoundError:
+        return not Path('/proc/self/comm').exists()
+    except OSError:
+        return True
+    return comm.startswith(('python', 'queuectl'))
+
+
 @cli.command()
 @click.pass_context
 def status(ctx):
     """Show system status"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    storage = _get_storage(ctx)
     
     # Get job counts
     counts = storage.get_job_counts()
@@ -184,7 +333,7 @@ def status(ctx):
         ["Dead (DLQ)", counts['dead']],
         ["Total", sum(counts.values())]
     ]
-    click.echo(tabulate(job_table, headers=["State", "Count"], tablefmt="simple"))
+    click.echo(simple_table(job_table, headers=["State", "Count"]))
     
     # Worker information
     click.echo(f"\nActive Workers: {len(workers)}")
@@ -192,28 +341,27 @@ def status(ctx):
         worker_table = []
         for w in workers:
             worker_table.append([
-                w['worker_id'][:8],
+                w['worker_id'],
                 w['pid'],
                 w['started_at'],
                 w['last_heartbeat']
             ])
-        click.echo(tabulate(
+        click.echo(simple_table(
             worker_table,
-            headers=["Worker ID", "PID", "Started", "Last Heartbeat"],
-            tablefmt="simple"
+            headers=["Worker ID", "PID", "Started", "Last Heartbeat"]
         ))
 
 
-@cli.command()
+@cli.command('list')
 @click.option('--state', help='Filter by job state')
 @click.option('--limit', default=100, help='Maximum number of jobs to list')
+@click.option('--before', help='Show jobs after this job ID (next page)')
 @click.pass_context
-def list(ctx, state, limit):
+def list_jobs(ctx, state, limit, before):
     """List jobs"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    storage = _get_storage(ctx)
     
-    jobs = storage.list_jobs(state=state, limit=limit)
+    jobs = storage.list_jobs_preview(state=state, limit=limit, before=before)
     
     if not jobs:
         click.echo("No jobs found")
@@ -224,19 +372,19 @@ def list(ctx, state, limit):
     for job in jobs:
         job_table.append([
             job['id'][:16],
-            job['command'][:40],
+            job['command'],
             job['state'],
             f"{job['attempts']}/{job['max_retries']}",
-            job['next_run_at'][:19],
-            job['updated_at'][:19]
+            job['next_run_at'],
+            job['updated_at']
         ])
     
-    click.echo(tabulate(
+    click.echo(simple_table(
         job_table,
-        headers=["Job ID", "Command", "State", "Attempts", "Next Run", "Updated"],
-        tablefmt="simple"
+        headers=["Job ID", "Command", "State", "Attempts", "Next Run", "Updated"]
     ))
     click.echo(f"\nTotal: {len(jobs)} job(s)")
+    _echo_next_page(jobs, limit)
 
 
 @cli.group()
@@ -246,13 +394,20 @@ def dlq():
 
 
 @dlq.command('list')
+@click.option('--limit', default=100, help='Maximum number of jobs to list')
+@click.option('--before', help='Show jobs after this job ID (next page)')
+@click.option('--all', 'show_all', is_flag=True, help='List every dead job (no limit)')
 @click.pass_context
-def dlq_list(ctx):
+def dlq_list(ctx, limit, before, show_all):
     """List dead jobs"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    storage = _get_storage(ctx)
+    
+    if show_all:
+        limit = -1
     
-    jobs = storage.list_jobs(state='dead', limit=1000)
+    jobs = storage.list_jobs_preview(
+        state='dead', limit=limit, before=before, command_width=30
+    )
     
     if not jobs:
         click.echo("No dead jobs in DLQ")
@@ -261,21 +416,26 @@ def dlq_list(ctx):
     # Format job table
     job_table = []
     for job in jobs:
-        error_preview = (job['last_error'] or '')[:50]
         job_table.append([
             job['id'][:16],
-            job['command'][:30],
+            job['command'],
             job['attempts'],
-            error_preview,
-            job['updated_at'][:19]
+            job['last_error'],
+            job['updated_at']
         ])
     
-    click.echo(tabulate(
+    click.echo(simple_table(
         job_table,
-        headers=["Job ID", "Command", "Attempts", "Last Error", "Updated"],
-        tablefmt="simple"
+        headers=["Job ID", "Command", "Attempts", "Last Error", "Updated"]
     ))
     click.echo(f"\nTotal: {len(jobs)} dead job(s)")
+    _echo_next_page(jobs, limit)
+
+
+def _echo_next_page(jobs, limit: int):
+    """Print how to fetch the next page when a listing hit its limit."""
+    if limit > 0 and len(jobs) == limit:
+        click.echo(f"More jobs may exist: use --before {jobs[-1]['id']}")
 
 
 @dlq.command('retry')
@@ -284,8 +444,7 @@ def dlq_list(ctx):
 @click.pass_context
 def dlq_retry(ctx, job_id, no_reset_attempts):
     """Retry a dead job"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    storage = _get_storage(ctx)
     
     success = storage.retry_dlq_job(job_id, reset_attempts=not no_reset_attempts)
     
@@ -303,8 +462,7 @@ def dlq_retry(ctx, job_id, no_reset_attempts):
 @click.pass_context
 def dlq_delete(ctx, job_id):
     """Delete a dead job"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    storage = _get_storage(ctx)
     
     success = storage.delete_dlq_job(job_id)
     
@@ -327,8 +485,9 @@ def config():
 @click.pass_context
 def config_set(ctx, key, value):
     """Set configuration value"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    from .config import Config
+    
+    storage = _get_storage(ctx)
     cfg = Config(storage)
     
     cfg.set(key, value)
@@ -340,8 +499,9 @@ def config_set(ctx, key, value):
 @click.pass_context
 def config_get(ctx, key):
     """Get configuration value"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    from .config import Config
+    
+    storage = _get_storage(ctx)
     cfg = Config(storage)
     
     value = cfg.get(key)
@@ -356,15 +516,14 @@ def config_get(ctx, key):
 @click.pass_context
 def config_show(ctx):
     """Show all configuration"""
-    db_path = ctx.obj['db_path']
-    storage = Storage(db_path)
+    from .config import Config
+    
+    storage = _get_storage(ctx)
     cfg = Config(storage)
     
     all_config = cfg.get_all()
     
-    if not all_config:
-        click.echo("No configuration set (using defaults)")
-        return
+    from tabulate import tabulate
     
     config_table = [[k, v] for k, v in all_config.items()]
     click.echo(tabulate(config_table, headers=["Key", "Value"], tablefmt="simple"))
@@ -2,7 +2,7 @@
 Configuration management for QueueCTL.
 """
 
-from typing import Optional, Dict
+from typing import Dict, Iterable, Optional
 
 
 DEFAULT_CONFIG = {
@@ -11,55 +11,104 @@ DEFAULT_CONFIG = {
     'worker_default_count': '1',
     'abandoned_threshold': '3600',
     'poll_interval': '1.0',
-    'log_level': 'INFO'
+    'poll_max': '5.0',
+    'heartbeat_interval': '10',
+    'log_level': 'INFO',
+    'log_dir': '',
+    'worker_cpu_affinity': 'false'
 }
 
 
 class Config:
-    """Configuration manager."""
+    """
+    Configuration manager.
     
-    def __init__(self, storage):
+    Defaults live in DEFAULT_CONFIG and are never written to the database;
+    only values set explicitly via `set` are persisted. Stored values are
+    read once per instance and cached.
+    """
+    
+    def __init__(self, storage, keys: Optional[Iterable[str]] = None):
+        """
+        Args:
+            storage: Storage instance holding the config table
+            keys: Only load these keys from the database (optional). Other
+                keys resolve to their defaults; `get_all` still loads all.
+        """
         self.storage = storage
-        self._ensure_defaults()
+        self._keys = list(keys) if keys is not None else None
+        self._values: Optional[Dict[str, str]] = None
+        # Parsed numeric values, so hot loops skip int()/float() per read
+        self._int_cache: Dict[str, int] = {}
+        self._float_cache: Dict[str, float] = {}
     
-    def _ensure_defaults(self):
-        """Ensure default configuration values exist."""
-        existing = self.storage.get_all_config()
-        for key, value in DEFAULT_CONFIG.items():
-            if key not in existing:
-                self.storage.set_config(key, value)
+    def _stored(self) -> Dict[str, str]:
+        """Load stored configuration values once per instance."""
+        if self._values is None:
+            if self._keys is not None:
+                self._values = self.storage.get_config_many(self._keys)
+            else:
+                self._values = self.storage.get_all_config()
+        return self._values
     
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """Get configuration value."""
-        value = self.storage.get_config(key)
+        value = self._stored().get(key)
         if value is None:
             value = DEFAULT_CONFIG.get(key, default)
         return value
     
     def get_int(self, key: str, default: int) -> int:
         """Get configuration value as integer."""
+        cached = self._int_cache.get(key)
+        if cached is not None:
+            return cached
         value = self.get(key)
         if value is None:
             return default
         try:
-            return int(value)
+            parsed = self._int_cache[key] = int(value)
         except ValueError:
             return default
+        return parsed
     
     def get_float(self, key: str, default: float) -> float:
         """Get configuration value as float."""
+        cached = self._float_cache.get(key)
+        if cached is not None:
+            return cached
         value = self.get(key)
         if value is None:
             return default
         try:
-            return float(value)
+            parsed = self._float_cache[key] = float(value)
         except ValueError:
             return default
+        return parsed
+    
+    def get_bool(self, key: str, default: bool) -> bool:
+        """Get configuration value as boolean (1/true/yes/on)."""
+        value = self.get(key)
+        if value is None:
+            return default
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
     
     def set(self, key: str, value: str):
         """Set configuration value."""
         self.storage.set_config(key, str(value))
+        if self._values is not None:
+            self._values[key] = str(value)
+        self._int_cache.pop(key, None)
+        self._float_cache.pop(key, None)
+    
+    def reload(self):
+        """Drop cached values so the next read fetches them from the database."""
+        self._values = None
+        self._int_cache.clear()
+        self._float_cache.clear()
     
     def get_all(self) -> Dict[str, str]:
-        """Get all configuration values."""
-        return self.storage.get_all_config()
\ No newline at end of file
+        """Get all configuration values, with defaults for unset keys."""
+        if self._keys is not None:
+            return {**DEFAULT_CONFIG, **self.storage.get_all_config()}
+        return {**DEFAULT_CONFIG, **self._stored()}
\ No newline at end of file
@@ -4,95 +4,253 @@ Job execution module - runs commands and captures results.
 
 import subprocess
 import logging
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import time
 from dataclasses import dataclass
-from typing import Optional
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# Characters that need a real shell (pipes, redirection, expansion, ...)
+SHELL_METACHARS = frozenset('|&;<>()$`\\*?[]{}~#!\n')
 
-@dataclass
+# Characters allowed in log file names derived from job IDs
+_UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+@dataclass(slots=True, frozen=True)
 class ExecutionResult:
     """Result of command execution."""
     returncode: int
     stdout: str
     stderr: str
     duration: float
+    duration_ns: int
+    stdout_path: Optional[str] = None
+    stderr_path: Optional[str] = None
 
 
 class Executor:
     """Executes job commands via subprocess."""
     
-    def __init__(self, timeout: int = 3600):
+    def __init__(self, timeout: int = 3600, max_output_bytes: int = 1024 * 1024,
+                 log_dir: Optional[str] = None, tail_bytes: int = 4096):
         """
         Initialize executor.
         
         Args:
             timeout: Maximum execution time in seconds
+            max_output_bytes: Maximum bytes of stdout/stderr kept per stream
+            log_dir: Write full job output to files in this directory
+                instead of buffering it in memory (optional)
+            tail_bytes: With log_dir, bytes from the end of each log kept
+                on the result
         """
         self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.tail_bytes = tail_bytes
+        self._which_cache: Dict[str, Optional[str]] = {}
+        
+        if self.log_dir:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _decode(self, data: Optional[bytes]) -> str:
+        """Truncate captured output to the size cap and decode it once."""
+        if not data:
+            return ""
+        return data[:self.max_output_bytes].decode('utf-8', 'replace')
+    
+    def _open_logs(self, log_name: Optional[str]):
+        """Create the stdout/stderr log files for one execution."""
+        prefix = _UNSAFE_NAME_CHARS.sub('_', log_name or 'job') + '.'
+        files, paths = [], []
+        for suffix in ('.stdout', '.stderr'):
+            fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=self.log_dir)
+            files.append(os.fdopen(fd, 'w+b'))
+            paths.append(path)
+        return files, paths
+    
+    def _read_tail(self, f) -> str:
+        """Read and decode the last tail_bytes of a log file."""
+        size = os.fstat(f.fileno()).st_size
+        n = min(size, self.tail_bytes)
+        return self._decode(os.pread(f.fileno(), n, size - n))
+    
+    def _which(self, program: str) -> Optional[str]:
+        """Resolve a program on PATH, caching the result."""
+        if program not in self._which_cache:
+            self._which_cache[program] = shutil.which(program)
+        return self._which_cache[program]
+    
+    def _prepare(self, command: str, shell: Optional[bool]) -> Tuple[Union[str, List[str]], bool, Optional[str]]:
+        """
+        Decide how to launch a command.
+        
+        Simple commands (no shell metacharacters, no leading variable
+        assignment, program found on PATH) are split with shlex and
+        executed directly, saving a /bin/sh fork+exec per job.
+        
+        Returns:
+            (args, use_shell, executable) for subprocess.Popen
+        """
+        if shell:
+            return command, True, None
+        
+        if shell is None and any(c in SHELL_METACHARS for c in command):
+            return command, True, None
+        
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            # Unbalanced quotes: let the shell report the error
+            return command, True, None
+        
+        if not args:
+            return command, True, None
+        
+        if shell is None:
+            if '=' in args[0]:
+                return command, True, None
+            executable = self._which(args[0])
+            if executable is None:
+                # Shell builtin (exit, cd, ...) or missing program
+                return command, True, None
+            return args, False, executable
+        
+        return args, False, self._which(args[0])
     
-    def execute(self, command: str) -> ExecutionResult:
+    def _wait(self, proc: subprocess.Popen, on_slow: Optional[Callable[[], None]],
+              slow_after: float) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Wait for the command, calling on_slow once if it outlasts slow_after."""
+        if on_slow is None or slow_after >= self.timeout:
+            return proc.communicate(timeout=self.timeout)
+        
+        try:
+            return proc.communicate(timeout=slow_after)
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            on_slow()
+        except Exception as e:
+            logger.error(f"Callback for slow command failed: {e}")
+        return proc.communicate(timeout=self.timeout - slow_after)
+    
+    def execute(self, command: str, shell: Optional[bool] = None,
+                log_name: Optional[str] = None,
+                on_slow: Optional[Callable[[], None]] = None,
+                slow_after: float = 0.0) -> ExecutionResult:
         """
         Execute a command and return the result.
         
         Args:
             command: Shell command to execute
+            shell: True to always run via /bin/sh, False to always exec
+                the shlex-split command directly, None to decide per command
+            log_name: Prefix for the log file names when log_dir is set
+            on_slow: Called once, while the command keeps running, if it
+                is still running after slow_after seconds (optional)
+            slow_after: Seconds before on_slow is called
             
         Returns:
-            ExecutionResult with returncode, stdout, stderr
+            ExecutionResult with returncode, stdout, stderr. Output is
+            captured as bytes, truncated to max_output_bytes and decoded
+            as UTF-8 (invalid sequences replaced). With log_dir set, the
+            child writes straight to log files, stdout/stderr hold only
+            the last tail_bytes, and stdout_path/stderr_path name the files.
         
         Note:
-            Uses shell=True for command flexibility.
+            Commands using shell syntax run with shell=True.
             SECURITY WARNING: Only use with trusted commands!
         """
-        import time
+        args, use_shell, executable = self._prepare(command, shell)
         
-        start_time = time.time()
+        log_files = None
+        if self.log_dir:
+            log_files, log_paths = self._open_logs(log_name)
+            streams = {'stdout': log_files[0], 'stderr': log_files[1]}
+            paths = {'stdout_path': log_paths[0], 'stderr_path': log_paths[1]}
+        else:
+            streams = {'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE}
+            paths = {}
+        
+        start_ns = time.monotonic_ns()
         
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            with subprocess.Popen(
+                args,
+                shell=use_shell,
+                executable=executable,
+                **streams,
+                # Descriptors opened by Python (PEP 446) and SQLite are
+                # close-on-exec already. Leaving close_fds off lets CPython
+                # launch the child with posix_spawn (vfork) instead of
+                # fork+exec, whose cost grows with the worker's RSS.
+                close_fds=False
+            ) as proc:
+                try:
+                    out, err = self._wait(proc, on_slow, slow_after)
+                except BaseException:
+                    proc.kill()
+                    raise
             
-            duration = time.time() - start_time
+            duration_ns = time.monotonic_ns() - start_ns
+            
+            if log_files:
+                stdout, stderr = (self._read_tail(f) for f in log_files)
+            else:
+                stdout, stderr = self._decode(out), self._decode(err)
             
             return ExecutionResult(
-                returncode=result.returncode,
-                stdout=result.stdout,
-                stderr=result.stderr,
-                duration=duration
+                returncode=proc.returncode,
+                stdout=stdout,
+                stderr=stderr,
+                duration=duration_ns / 1e9,
+                duration_ns=duration_ns,
+                **paths
             )
         
         except subprocess.TimeoutExpired:
-            duration = time.time() - start_time
+            duration_ns = time.monotonic_ns() - start_ns
             logger.error(f"Command timed out after {self.timeout}s: {command}")
             return ExecutionResult(
                 returncode=-1,
                 stdout="",
                 stderr=f"Command timed out after {self.timeout} seconds",
-                duration=duration
+                duration=duration_ns / 1e9,
+                duration_ns=duration_ns,
+                **paths
             )
         
         except FileNotFoundError as e:
-            duration = time.time() - start_time
+            duration_ns = time.monotonic_ns() - start_ns
             logger.error(f"Command not found: {command}")
             return ExecutionResult(
                 returncode=127,
                 stdout="",
                 stderr=f"Command not found: {e}",
-                duration=duration
+                duration=duration_ns / 1e9,
+                duration_ns=duration_ns,
+                **paths
             )
         
         except Exception as e:
-            duration = time.time() - start_time
+            duration_ns = time.monotonic_ns() - start_ns
             logger.error(f"Execution error: {e}")
             return ExecutionResult(
                 returncode=-1,
                 stdout="",
                 stderr=f"Execution error: {str(e)}",
-                duration=duration
-            )
\ No newline at end of file
+                duration=duration_ns / 1e9,
+                duration_ns=duration_ns,
+                **paths
+            )
+        
+        finally:
+            for f in log_files or ():
+                f.close()
\ No newline at end of file
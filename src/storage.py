@@ -3,68 +3,664 @@ Storage module for QueueCTL - handles all database operations with SQLite.
 Implements atomic locking for multi-worker job acquisition.
 """
 
+import os
 import sqlite3
-import json
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any
+import queue
+import select
+import stat
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from contextlib import contextmanager
 import logging
+from .utils import json_dumps
 
 logger = logging.getLogger(__name__)
 
+JOB_STATES = ('pending', 'processing', 'completed', 'failed', 'dead')
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last formatted timestamp
+_iso_second = (None, '')
+
+
+def _iso(ts: float) -> str:
+    """
+    Format a Unix timestamp as a UTC ISO-8601 string.
+    
+    Matches datetime.isoformat() output (always with microseconds) but
+    only formats the date and time part once per second.
+    """
+    global _iso_second
+    second = int(ts)
+    if _iso_second[0] != second:
+        _iso_second = (second, time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second)))
+    return f"{_iso_second[1]}.{int((ts - second) * 1e6):06d}+00:00"
+
+
+def _iso_us(us: int) -> str:
+    """Like `_iso`, for an integer count of microseconds since the epoch."""
+    global _iso_second
+    second, micros = divmod(us, 1_000_000)
+    if _iso_second[0] != second:
+        _iso_second = (second, time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second)))
+    return f"{_iso_second[1]}.{micros:06d}+00:00"
+
+
+# Row-to-dict functions generated per result shape, keyed by column names
+_row_adapters: Dict[Tuple[str, ...], Callable[[tuple], Dict[str, Any]]] = {}
+
+
+def _row_adapter(columns: Tuple[str, ...]) -> Callable[[tuple], Dict[str, Any]]:
+    """
+    Return a function turning a result tuple with these columns into a dict.
+    
+    The function is generated once per column list and builds the dict
+    from a literal with the keys spelled out, about twice as fast as
+    dict(zip(columns, row)) or dict(sqlite3.Row).
+    """
+    adapter = _row_adapters.get(columns)
+    if adapter is None:
+        items = ", ".join(f"{name!r}: row[{i}]" for i, name in enumerate(columns))
+        namespace: Dict[str, Any] = {}
+        exec(f"def adapt(row):\n    return {{{items}}}", namespace)
+        adapter = _row_adapters[columns] = namespace['adapt']
+    return adapter
+
+
+def _ms(ts: float) -> int:
+    """Unix timestamp in whole milliseconds."""
+    return int(ts * 1000)
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO-8601 string."""
+    return _iso(time.time())
+
+
+# Applied once to every new pooled connection. WAL (set once by init_db
+# and persisted in the file) makes NORMAL sync durable across application
+# crashes; only an OS crash can lose the last commits. The busy timeout
+# comes from sqlite3.connect(timeout=).
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+
+# Worker registrations and heartbeats live in a separate database file
+# attached as "ephemeral". The data is disposable, so that file skips
+# fsync entirely and heartbeats never write to the jobs WAL.
+EPHEMERAL_PRAGMAS = (
+    "PRAGMA ephemeral.synchronous=OFF",
+)
+
+# Persistent settings written into the database files by init_db only.
+# Switching journal mode needs an exclusive lock, so worker processes
+# opening the database must not repeat it.
+BOOTSTRAP_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA ephemeral.journal_mode=WAL",
+)
+
+
+# Jobs are clustered by their TEXT primary key: lookups and updates by
+# id hit the table B-tree directly and inserts maintain one B-tree fewer
+# than a rowid table with a separate primary key index
+_JOBS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        max_retries INTEGER DEFAULT 3,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        next_run_at TEXT NOT NULL,
+        last_error TEXT,
+        locked_by TEXT,
+        locked_at TEXT,
+        shell INTEGER,
+        next_run_at_ms INTEGER
+    ) WITHOUT ROWID
+"""
+
+# SQL expression converting an ISO-8601 timestamp to Unix milliseconds.
+# next_run_at_ms mirrors next_run_at so the due-job check compares
+# integers instead of strings.
+_ISO_TO_MS = "CAST(ROUND((julianday({}) - 2440587.5) * 86400000) AS INTEGER)"
+
+# Statements run on the hot paths, kept as constants so each call
+# reuses the connection's prepared statement cache
+_SQL_ENQUEUE = f"""
+    INSERT INTO jobs (
+        id, command, state, attempts, max_retries,
+        created_at, updated_at, next_run_at, shell, next_run_at_ms
+    ) VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, coalesce(?10, {_ISO_TO_MS.format('?8')}))
+"""
+
+# Single-job enqueue: a duplicate ID returns no row instead of raising
+_SQL_ENQUEUE_IF_NEW = _SQL_ENQUEUE.rstrip() + """
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+"""
+
+# Jobs a worker may claim: new ones, and failed ones whose retry
+# backoff has expired (both once next_run_at_ms has passed)
+_RUNNABLE = "state IN ('pending', 'failed')"
+
+# Read-only check for a due job. Runs under a WAL read snapshot, so idle
+# workers find out the queue is empty without queueing for the write lock
+_SQL_HAS_DUE = f"""
+    SELECT 1 FROM jobs
+    WHERE {_RUNNABLE} AND next_run_at_ms <= ?
+    LIMIT 1
+"""
+
+_SQL_ACQUIRE = f"""
+    UPDATE jobs
+    SET state = 'processing',
+        locked_by = ?,
+        locked_at = ?,
+        attempts = attempts + 1,
+        updated_at = ?
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE {_RUNNABLE}
+        AND next_run_at_ms <= ?
+        ORDER BY created_at
+        LIMIT ?
+    )
+    RETURNING *
+"""
+
+# Hand claimed-but-unstarted jobs back, undoing the claim's attempt count
+_SQL_RELEASE = """
+    UPDATE jobs
+    SET state = 'pending',
+        attempts = attempts - 1,
+        locked_by = NULL,
+        locked_at = NULL,
+        updated_at = ?
+    WHERE id = ? AND state = 'processing' AND locked_by = ?
+"""
+
+_SQL_COMPLETE = """
+    UPDATE jobs
+    SET state = 'completed',
+        updated_at = ?,
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = ?
+"""
+
+_SQL_RETRY_STATE = "SELECT attempts, max_retries FROM jobs WHERE id = ?"
+
+_SQL_MARK_DEAD = """
+    UPDATE jobs
+    SET state = 'dead',
+        updated_at = ?,
+        last_error = ?,
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = ?
+"""
+
+_SQL_MARK_FAILED = """
+    UPDATE jobs
+    SET state = 'failed',
+        updated_at = ?,
+        next_run_at = ?,
+        next_run_at_ms = ?,
+        last_error = ?,
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = ?
+"""
+
+_SQL_GET_JOB = "SELECT * FROM jobs WHERE id = ?"
+
+# Every known state is listed, in JOB_STATES order, with 0 for states
+# that have no jobs
+_SQL_COUNT_BY_STATE = f"""
+    WITH s(pos, state) AS (
+        VALUES {", ".join(f"({i}, '{state}')" for i, state in enumerate(JOB_STATES))}
+    )
+    SELECT s.state, coalesce(c.count, 0)
+    FROM s LEFT JOIN (
+        SELECT state, COUNT(*) AS count FROM jobs GROUP BY state
+    ) AS c USING (state)
+    ORDER BY s.pos
+"""
+
+_SQL_RETRY_DLQ_RESET = """
+    UPDATE jobs
+    SET state = 'pending',
+        attempts = 0,
+        next_run_at = ?,
+        next_run_at_ms = ?,
+        updated_at = ?,
+        last_error = NULL
+    WHERE id = ? AND state = 'dead'
+"""
+
+_SQL_RETRY_DLQ = """
+    UPDATE jobs
+    SET state = 'pending',
+        next_run_at = ?,
+        next_run_at_ms = ?,
+        updated_at = ?,
+        last_error = NULL
+    WHERE id = ? AND state = 'dead'
+"""
+
+_SQL_DELETE_DLQ = "DELETE FROM jobs WHERE id = ? AND state = 'dead'"
+
+_SQL_RECOVER_ABANDONED = """
+    UPDATE jobs
+    SET state = 'pending',
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE state = 'processing'
+    AND locked_at < ?
+    RETURNING id
+"""
+
+_SQL_SET_CONFIG = """
+    INSERT OR REPLACE INTO config (key, value)
+    VALUES (?, ?)
+"""
+
+_SQL_GET_CONFIG = "SELECT value FROM config WHERE key = ?"
+
+_SQL_ALL_CONFIG = "SELECT key, value FROM config"
+
+_SQL_REGISTER_WORKER = """
+    INSERT OR REPLACE INTO ephemeral.workers (worker_id, pid, started_at, last_heartbeat)
+    VALUES (?, ?, ?, ?)
+"""
+
+_SQL_UNREGISTER_WORKER = "DELETE FROM ephemeral.workers WHERE worker_id = ?"
+
+_SQL_HEARTBEAT = "UPDATE ephemeral.workers SET last_heartbeat = ? WHERE worker_id = ?"
+
+_SQL_ACTIVE_WORKERS = "SELECT * FROM ephemeral.workers ORDER BY started_at"
+
+
+def workers_db_path(db_path: str) -> str:
+    """Path of the database file holding the workers table."""
+    if db_path == ':memory:':
+        return db_path
+    return f"{db_path}.workers"
+
+
+def notify_path(db_path: str) -> Optional[str]:
+    """Path of the FIFO used to wake idle workers, None for in-memory databases."""
+    if db_path == ':memory:':
+        return None
+    return f"{db_path}.notify"
+
+
+def remove_notify_fifo(db_path: str):
+    """Remove the notify FIFO, once no workers are left listening on it."""
+    path = notify_path(db_path)
+    if path is None:
+        return
+    try:
+        if stat.S_ISFIFO(os.lstat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _drain(fd: int):
+    """Read and discard whatever is buffered on a non-blocking fd."""
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class _ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+    
+    Connections are opened lazily, up to `size`, set up once and then
+    reused, so each storage call costs a queue pop instead of an open,
+    a PRAGMA round-trip and a close.
+    """
+    
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = db_path
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        # Connections inherited across fork, kept referenced so the
+        # child never finalizes (closes) them
+        self._inherited: List[sqlite3.Connection] = []
+    
+    def _reset_after_fork(self):
+        """Forget connections opened by the parent process."""
+        while True:
+            try:
+                self._inherited.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and set up a new connection."""
+        conn = sqlite3.connect(
+            self.db_path, timeout=30.0, check_same_thread=False, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        
+        conn.execute("ATTACH DATABASE ? AS ephemeral", (workers_db_path(self.db_path),))
+        for pragma in EPHEMERAL_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def get(self) -> sqlite3.Connection:
+        """Take an idle connection, opening one if the pool is not full."""
+        if self._pid != os.getpid():
+            # SQLite connections must not be used across fork
+            self._reset_after_fork()
+        
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+        
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        return self._idle.get()
+    
+    def put(self, conn: sqlite3.Connection):
+        """Return a connection, discarding any uncommitted transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+    
+    def close(self):
+        """Close all idle connections, refreshing query planner statistics."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.debug(f"PRAGMA optimize failed: {e}")
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
 
 class Storage:
     """
     SQLite-based storage for job queue with atomic locking support.
     """
     
-    def __init__(self, db_path: str = "queuectl.db"):
+    def __init__(self, db_path: str = "queuectl.db", pool_size: int = 4):
+        """
+        Open storage for an existing database.
+        
+        The schema is not created or migrated here; use `bootstrap` (or
+        call `init_db`) once before workers open the database.
+        
+        Args:
+            db_path: SQLite database file path
+            pool_size: Maximum number of pooled connections
+        """
         self.db_path = db_path
-        self.init_db()
+        self._pool = _ConnectionPool(db_path, pool_size)
+        # Per-thread state: the connection pinned by _pinned() and
+        # whether batch() is deferring commits
+        self._local = threading.local()
+        # (read fd, keep-alive write fd) of the notify FIFO once opened by
+        # wait_for_change; () when it is unavailable
+        self._notify_fds: Optional[Tuple[int, ...]] = None
+    
+    @classmethod
+    def bootstrap(cls, db_path: str = "queuectl.db", **kwargs) -> "Storage":
+        """Open storage and create or migrate the schema."""
+        storage = cls(db_path, **kwargs)
+        storage.init_db()
+        return storage
     
     @contextmanager
     def get_connection(self):
-        """Get a database connection with row factory."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
+        """
+        Borrow a pooled database connection with row factory.
+        
+        Inside `batch()` or `job_session()` this is the connection pinned
+        to the current thread. Otherwise, uncommitted changes are rolled
+        back when the connection is returned to the pool.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._pool.get()
         try:
             yield conn
         finally:
-            conn.close()
+            self._pool.put(conn)
+    
+    @contextmanager
+    def _pinned(self):
+        """Route this thread's storage calls through one pooled connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        
+        with self.get_connection() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+    
+    def _commit(self, conn: sqlite3.Connection):
+        """Commit, unless a batch will commit on exit."""
+        if not getattr(self._local, 'batching', False):
+            conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Run several storage calls in one transaction, committed on exit.
+        
+        Calls made in this thread inside the block share one connection
+        and their individual commits are deferred, so e.g. a job update
+        and a heartbeat cost one commit instead of two. An exception
+        rolls the whole batch back; so does a call that rolls back on
+        its own error (acquire_job, enqueue_jobs_bulk). Nested batches
+        join the outer one.
+        """
+        if getattr(self._local, 'batching', False):
+            yield
+            return
+        
+        with self._pinned() as conn:
+            self._local.batching = True
+            self._local.notify = False
+            try:
+                yield
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.batching = False
+            if self._local.notify:
+                self._notify_work()
+    
+    @contextmanager
+    def job_session(self, worker_id: str, backoff_base: int = 2):
+        """
+        Acquire a job and record its outcome on one pooled connection.
+        
+        The claim is committed straight away (the write lock is not held
+        while the job runs); only the connection checkout is shared.
+        
+        Args:
+            worker_id: Unique identifier for the worker
+            backoff_base: Base for exponential backoff on failure
+        
+        Yields:
+            (job, complete): the acquired job dict (None if no job is
+            available) and a function to call with None on success or
+            an error message on failure. A job left without `complete`
+            stays processing until recovered as abandoned.
+        """
+        with self._pinned():
+            job = self.acquire_job(worker_id)
+            
+            def complete(error: Optional[str] = None):
+                self.finish_job(
+                    job['id'], worker_id, error, backoff_base,
+                    attempts=job['attempts'], max_retries=job['max_retries']
+                )
+            
+            yield job, complete
+    
+    def close(self):
+        """Close pooled connections (the storage may still be used afterwards)."""
+        self._pool.close()
+        for fd in self._notify_fds or ():
+            os.close(fd)
+        self._notify_fds = None
+    
+    def _notify_work(self):
+        """
+        Wake workers blocked in wait_for_change after new work is committed.
+        
+        Writes one byte to the notify FIFO. If no worker has opened it
+        (no FIFO, or no reader) there is nobody to wake and this is a
+        no-op; inside `batch()` the write waits for the batch commit.
+        """
+        if getattr(self._local, 'batching', False):
+            self._local.notify = True
+            return
+        
+        path = notify_path(self.db_path)
+        if path is None:
+            return
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return
+        try:
+            if stat.S_ISFIFO(os.fstat(fd).st_mode):
+                os.write(fd, b'\0')
+        except BlockingIOError:
+            # FIFO full: readers have plenty of pending wake-ups
+            pass
+        finally:
+            os.close(fd)
+    
+    def _notify_reader(self) -> Optional[int]:
+        """Open (creating if needed) the notify FIFO for reading."""
+        if self._notify_fds is None:
+            self._notify_fds = ()
+            path = notify_path(self.db_path)
+            if path is None or not hasattr(os, 'mkfifo'):
+                return None
+            try:
+                try:
+                    os.mkfifo(path)
+                except FileExistsError:
+                    pass
+                r = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+                if not stat.S_ISFIFO(os.fstat(r).st_mode):
+                    os.close(r)
+                    logger.warning(f"{path} is not a FIFO; falling back to polling")
+                    return None
+                # Holding a write end keeps select() from reporting EOF
+                # whenever no enqueuer has the FIFO open
+                w = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                logger.debug(f"Notify FIFO unavailable: {e}")
+                return None
+            self._notify_fds = (r, w)
+        return self._notify_fds[0] if self._notify_fds else None
     
     def init_db(self):
         """Initialize database schema."""
         with self.get_connection() as conn:
+            for pragma in BOOTSTRAP_PRAGMAS:
+                conn.execute(pragma)
+            
             # Jobs table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS jobs (
-                    id TEXT PRIMARY KEY,
-                    command TEXT NOT NULL,
-                    state TEXT NOT NULL,
-                    attempts INTEGER DEFAULT 0,
-                    max_retries INTEGER DEFAULT 3,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    next_run_at TEXT NOT NULL,
-                    last_error TEXT,
-                    locked_by TEXT,
-                    locked_at TEXT
-                )
-            """)
+            conn.execute(_JOBS_DDL.format(table='jobs'))
+            
+            # Columns added after the original schema, backfilled once
+            # when they are first added
+            added = self._add_missing_columns(conn, 'jobs', {
+                'shell': 'INTEGER',
+                'next_run_at_ms': 'INTEGER',
+            })
+            if 'next_run_at_ms' in added:
+                conn.execute(f"""
+                    UPDATE jobs SET next_run_at_ms = {_ISO_TO_MS.format('next_run_at')}
+                """)
+            
+            # Databases created before jobs became WITHOUT ROWID
+            self._rebuild_jobs_without_rowid(conn)
             
             # Indexes for performance
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_jobs_state_next_run 
-                ON jobs(state, next_run_at)
+                CREATE INDEX IF NOT EXISTS idx_jobs_state_created
+                ON jobs(state, created_at, id)
+            """)
+            
+            # acquire_job: seek straight to the due pending and failed jobs,
+            # leaving not-yet-due and far-future scheduled ones unread. The
+            # leading state column makes the planner prefer this index over
+            # idx_jobs_state_created, which has no stats to tell them apart.
+            conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_jobs_due
+                ON jobs(state, next_run_at_ms, created_at) WHERE {_RUNNABLE}
             """)
             
+            # recover_abandoned_jobs: only processing jobs are scanned,
+            # leading with state for the same reason
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_jobs_locked_by 
-                ON jobs(locked_by)
+                CREATE INDEX IF NOT EXISTS idx_jobs_processing_lock
+                ON jobs(state, locked_at) WHERE state = 'processing'
             """)
             
+            # Superseded by the partial indexes above
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_state_next_run")
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_locked_by")
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_pending")
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_pending_due")
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_pending_next_run")
+            conn.execute("DROP INDEX IF EXISTS idx_jobs_processing_locked_at")
+            
             # Config table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS config (
@@ -73,9 +669,10 @@ class Storage:
                 )
             """)
             
-            # Workers table
+            # Workers table (in the attached ephemeral database)
+            conn.execute("DROP TABLE IF EXISTS main.workers")
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS workers (
+                CREATE TABLE IF NOT EXISTS ephemeral.workers (
                     worker_id TEXT PRIMARY KEY,
                     pid INTEGER NOT NULL,
                     started_at TEXT NOT NULL,
@@ -86,6 +683,82 @@ class Storage:
             conn.commit()
             logger.info(f"Database initialized: {self.db_path}")
     
+    def _rebuild_jobs_without_rowid(self, conn):
+        """Copy a rowid jobs table into the WITHOUT ROWID layout."""
+        def needs_rebuild():
+            row = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'jobs'"
+            ).fetchone()
+            return 'WITHOUT ROWID' not in row['sql'].upper()
+        
+        if not needs_rebuild():
+            return
+        
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have rebuilt it while we waited for the lock
+            if needs_rebuild():
+                conn.execute("DROP TABLE IF EXISTS jobs_rebuild")
+                conn.execute(_JOBS_DDL.format(table='jobs_rebuild'))
+                columns = ", ".join(
+                    row['name'] for row in conn.execute("PRAGMA table_info(jobs_rebuild)")
+                )
+                conn.execute(f"""
+                    INSERT INTO jobs_rebuild ({columns})
+                    SELECT {columns} FROM jobs WHERE id IS NOT NULL
+                """)
+                conn.execute("DROP TABLE jobs")
+                conn.execute("ALTER TABLE jobs_rebuild RENAME TO jobs")
+                logger.info("Rebuilt jobs table as WITHOUT ROWID")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _add_missing_columns(self, conn, table: str, columns: Dict[str, str]) -> List[str]:
+        """
+        Add columns to an existing table created by an older schema.
+        
+        Returns:
+            Names of the columns that were added
+        """
+        existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                logger.info(f"Added column {table}.{name}")
+                added.append(name)
+        return added
+    
+    @staticmethod
+    def _job_row(job: Dict[str, Any], now_ts: float, seq: int = 0) -> tuple:
+        """
+        Build the _SQL_ENQUEUE parameters for a new job.
+        
+        A caller-supplied next_run_at is converted to milliseconds in SQL;
+        otherwise the job is due now and both forms come from now_ts.
+        seq is the job's position within a batch: its created_at is
+        offset by that many microseconds, so jobs enqueued together are
+        claimed in the order given rather than by ID.
+        """
+        now = _iso(now_ts)
+        scheduled = 'next_run_at' in job
+        return (
+            job['id'],
+            job['command'],
+            'pending',
+            0,
+            job.get('max_retries', 3),
+            _iso_us(int(now_ts * 1e6) + seq) if seq else now,
+            now,
+            job['next_run_at'] if scheduled else now,
+            job.get('shell'),
+            None if scheduled else _ms(now_ts)
+        )
+    
     def enqueue_job(self, job: Dict[str, Any]) -> bool:
         """
         Enqueue a new job.
@@ -96,31 +769,48 @@ class Storage:
         Returns:
             True if successful, False if job ID already exists
         """
-        try:
-            with self.get_connection() as conn:
-                now = datetime.now(timezone.utc).isoformat()
-                
-                conn.execute("""
-                    INSERT INTO jobs (
-                        id, command, state, attempts, max_retries,
-                        created_at, updated_at, next_run_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    job['id'],
-                    job['command'],
-                    'pending',
-                    0,
-                    job.get('max_retries', 3),
-                    now,
-                    now,
-                    job.get('next_run_at', now)
-                ))
-                conn.commit()
-                logger.info(f"Job enqueued: {job['id']}")
-                return True
-        except sqlite3.IntegrityError:
+        with self.get_connection() as conn:
+            now_ts = time.time()
+            
+            inserted = conn.execute(
+                _SQL_ENQUEUE_IF_NEW, self._job_row(job, now_ts)
+            ).fetchone() is not None
+            self._commit(conn)
+        
+        if not inserted:
             logger.error(f"Job ID already exists: {job['id']}")
             return False
+        
+        self._notify_work()
+        logger.info("Job enqueued: %s", job['id'])
+        return True
+    
+    def enqueue_jobs_bulk(self, jobs: List[Dict[str, Any]]) -> bool:
+        """
+        Enqueue many jobs in a single transaction.
+        
+        Args:
+            jobs: List of job dictionaries with id, command, and optional fields
+        
+        Returns:
+            True if all jobs were enqueued, False if any job ID already
+            exists (in which case none are enqueued)
+        """
+        now_ts = time.time()
+        rows = [self._job_row(job, now_ts, seq) for seq, job in enumerate(jobs)]
+        
+        with self.get_connection() as conn:
+            try:
+                conn.executemany(_SQL_ENQUEUE, rows)
+                self._commit(conn)
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                logger.error(f"Bulk enqueue rejected: {e}")
+                return False
+        
+        self._notify_work()
+        logger.info(f"Jobs enqueued: {len(rows)}")
+        return True
     
     def acquire_job(self, worker_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -132,175 +822,312 @@ class Storage:
         Returns:
             Job dictionary or None if no jobs available
         """
+        jobs = self.acquire_jobs(worker_id, 1)
+        return jobs[0] if jobs else None
+    
+    def acquire_jobs(self, worker_id: str, n: int) -> List[Dict[str, Any]]:
+        """
+        Atomically acquire up to n available jobs in one transaction.
+        
+        Jobs the worker does not get to run should be handed back with
+        `release_jobs`.
+        
+        Args:
+            worker_id: Unique identifier for the worker
+            n: Maximum number of jobs to claim
+        
+        Returns:
+            Job dictionaries, oldest first (empty if no jobs available)
+        """
         with self.get_connection() as conn:
             try:
-                # BEGIN IMMEDIATE to get exclusive write lock
-                conn.execute("BEGIN IMMEDIATE")
+                now_ts = time.time()
+                now_ms = _ms(now_ts)
                 
-                now = datetime.now(timezone.utc).isoformat()
+                # An UPDATE takes the write lock even when it matches
+                # nothing; peek first so an empty queue costs only a read
+                if conn.execute(_SQL_HAS_DUE, (now_ms,)).fetchone() is None:
+                    return []
                 
-                # Find next available job
-                cursor = conn.execute("""
-                    SELECT * FROM jobs
-                    WHERE state = 'pending'
-                    AND next_run_at <= ?
-                    ORDER BY created_at
-                    LIMIT 1
-                """, (now,))
+                now = _iso(now_ts)
                 
-                row = cursor.fetchone()
+                # Claim the next available jobs in one statement; the
+                # UPDATE takes the write lock, so no two workers can
+                # select the same row
+                jobs = self._fetch_dicts(
+                    conn, _SQL_ACQUIRE, (worker_id, now, now, now_ms, n)
+                )
                 
-                if row:
-                    job_id = row['id']
-                    
-                    # Atomically lock the job
-                    conn.execute("""
-                        UPDATE jobs
-                        SET state = 'processing',
-                            locked_by = ?,
-                            locked_at = ?,
-                            attempts = attempts + 1,
-                            updated_at = ?
-                        WHERE id = ?
-                    """, (worker_id, now, now, job_id))
-                    
-                    conn.commit()
-                    
-                    # Fetch the updated job
-                    cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-                    job = dict(cursor.fetchone())
-                    logger.info(f"Job acquired: {job_id} by worker {worker_id}")
-                    return job
-                else:
-                    conn.commit()
-                    return None
+                self._commit(conn)
                     
             except sqlite3.OperationalError as e:
                 conn.rollback()
                 logger.warning(f"Failed to acquire job: {e}")
-                return None
+                return []
+        
+        # RETURNING rows come back in no particular order
+        jobs.sort(key=lambda job: (job['created_at'], job['id']))
+        if logger.isEnabledFor(logging.INFO):
+            for job in jobs:
+                logger.info("Job acquired: %s by worker %s", job['id'], worker_id)
+        return jobs
+    
+    def release_jobs(self, worker_id: str, job_ids: List[str]) -> int:
+        """
+        Return claimed jobs that were never started to the pending state.
+        
+        Args:
+            worker_id: Worker that claimed the jobs
+            job_ids: Job identifiers to release
+        
+        Returns:
+            Number of jobs released
+        """
+        if not job_ids:
+            return 0
+        
+        with self.get_connection() as conn:
+            now = _now_iso()
+            cursor = conn.executemany(
+                _SQL_RELEASE, [(now, job_id, worker_id) for job_id in job_ids]
+            )
+            released = cursor.rowcount
+            self._commit(conn)
+        
+        if released:
+            self._notify_work()
+        
+        logger.info(f"Released {released} unstarted jobs from worker {worker_id}")
+        return released
     
     def update_job_success(self, job_id: str):
         """Mark job as completed successfully."""
         with self.get_connection() as conn:
-            now = datetime.now(timezone.utc).isoformat()
-            conn.execute("""
-                UPDATE jobs
-                SET state = 'completed',
-                    updated_at = ?,
-                    locked_by = NULL,
-                    locked_at = NULL
-                WHERE id = ?
-            """, (now, job_id))
-            conn.commit()
-            logger.info(f"Job completed: {job_id}")
+            now = _now_iso()
+            conn.execute(_SQL_COMPLETE, (now, job_id))
+            self._commit(conn)
+            logger.info("Job completed: %s", job_id)
+    
+    def finish_job(self, job_id: str, worker_id: str, error: Any = None,
+                   backoff_base: int = 2, attempts: Optional[int] = None,
+                   max_retries: Optional[int] = None):
+        """
+        Record a job's outcome and the worker's heartbeat in one commit.
+        
+        Args:
+            job_id: Job identifier
+            worker_id: Worker that ran the job
+            error: None on success, otherwise the failure passed to
+                `update_job_failure`
+            backoff_base: Base for exponential backoff calculation
+            attempts: The job's current attempt count, if already known
+            max_retries: The job's max_retries, if already known
+        """
+        with self.batch():
+            if error is None:
+                self.update_job_success(job_id)
+            else:
+                self.update_job_failure(
+                    job_id, error, backoff_base,
+                    attempts=attempts, max_retries=max_retries
+                )
+            self.update_worker_heartbeat(worker_id)
+    
+    def bulk_update_success(self, job_ids: List[str]):
+        """Mark several jobs as completed in one transaction."""
+        if not job_ids:
+            return
+        
+        with self.get_connection() as conn:
+            now = _now_iso()
+            conn.executemany(_SQL_COMPLETE, [(now, job_id) for job_id in job_ids])
+            self._commit(conn)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Jobs completed: %s", ', '.join(job_ids))
     
-    def update_job_failure(self, job_id: str, error: str, backoff_base: int = 2):
+    def bulk_update_failure(self, rows: List[Tuple[str, Any, int, int]], backoff_base: int = 2):
+        """
+        Record several failures in one transaction.
+        
+        Args:
+            rows: (job_id, error, attempts, max_retries) per failed job,
+                as accepted by `update_job_failure`
+            backoff_base: Base for exponential backoff calculation
+        """
+        if not rows:
+            return
+        
+        with self.batch():
+            for job_id, error, attempts, max_retries in rows:
+                self.update_job_failure(
+                    job_id, error, backoff_base,
+                    attempts=attempts, max_retries=max_retries
+                )
+    
+    def update_job_failure(self, job_id: str, error: Any, backoff_base: int = 2,
+                           attempts: Optional[int] = None,
+                           max_retries: Optional[int] = None):
         """
         Update job after failure with retry logic.
         
         Args:
             job_id: Job identifier
-            error: Error message
+            error: Error message; other values (e.g. a dict of details)
+                are stored as JSON text
             backoff_base: Base for exponential backoff calculation
+            attempts: The job's current attempt count, if already known
+                (e.g. from the dict returned by acquire_job)
+            max_retries: The job's max_retries, if already known
+        
+        When both attempts and max_retries are given, the job row is
+        not read back before it is updated.
         """
+        if not isinstance(error, str):
+            error = json_dumps(error)
+        
         with self.get_connection() as conn:
-            now = datetime.now(timezone.utc)
+            now_ts = time.time()
+            now = _iso(now_ts)
             
-            # Get current job state
-            cursor = conn.execute("""
-                SELECT attempts, max_retries FROM jobs WHERE id = ?
-            """, (job_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                logger.error(f"Job not found: {job_id}")
-                return
-            
-            attempts = row['attempts']
-            max_retries = row['max_retries']
+            if attempts is None or max_retries is None:
+                # Get current job state
+                cursor = conn.execute(_SQL_RETRY_STATE, (job_id,))
+                row = cursor.fetchone()
+                
+                if not row:
+                    logger.error(f"Job not found: {job_id}")
+                    return
+                
+                attempts = row['attempts']
+                max_retries = row['max_retries']
             
             if attempts >= max_retries:
                 # Move to DLQ
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = 'dead',
-                        updated_at = ?,
-                        last_error = ?,
-                        locked_by = NULL,
-                        locked_at = NULL
-                    WHERE id = ?
-                """, (now.isoformat(), error, job_id))
-                logger.info(f"Job moved to DLQ: {job_id}")
+                conn.execute(_SQL_MARK_DEAD, (now, error, job_id))
+                logger.info("Job moved to DLQ: %s", job_id)
             else:
                 # Calculate exponential backoff
                 delay_seconds = backoff_base ** attempts
-                next_run = now + timedelta(seconds=delay_seconds)
+                next_run_ts = now_ts + delay_seconds
                 
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = 'failed',
-                        updated_at = ?,
-                        next_run_at = ?,
-                        last_error = ?,
-                        locked_by = NULL,
-                        locked_at = NULL
-                    WHERE id = ?
-                """, (now.isoformat(), next_run.isoformat(), error, job_id))
-                logger.info(f"Job failed, will retry in {delay_seconds}s: {job_id}")
+                conn.execute(_SQL_MARK_FAILED, (
+                    now, _iso(next_run_ts), _ms(next_run_ts), error, job_id
+                ))
+                logger.info("Job failed, will retry in %ss: %s", delay_seconds, job_id)
             
-            conn.commit()
+            self._commit(conn)
     
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job by ID."""
         with self.get_connection() as conn:
-            cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+            return self._fetch_dict(conn, _SQL_GET_JOB, (job_id,))
     
-    def list_jobs(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    def list_jobs(self, state: Optional[str] = None, limit: int = 100,
+                  before: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        List jobs with optional filtering.
+        List jobs, newest first, with optional filtering.
+        
+        Pagination is keyset-based: pass the ID of the last job of the
+        previous page as `before` to fetch the next page.
         
         Args:
             state: Filter by job state (optional)
-            limit: Maximum number of jobs to return
+            limit: Maximum number of jobs to return (negative for no limit)
+            before: Only return jobs listed after this job ID (optional)
             
         Returns:
             List of job dictionaries
         """
+        return self._list("*", state, limit, before)
+    
+    def list_jobs_preview(self, state: Optional[str] = None, limit: int = 100,
+                          before: Optional[str] = None, command_width: int = 40,
+                          error_width: int = 50) -> List[Dict[str, Any]]:
+        """
+        List jobs like `list_jobs`, with long text columns truncated in SQL.
+        
+        Only the characters that will be displayed are read out of
+        SQLite, so jobs with large commands or error output stay cheap
+        to list. Timestamps are cut to seconds precision.
+        
+        Args:
+            state: Filter by job state (optional)
+            limit: Maximum number of jobs to return (negative for no limit)
+            before: Only return jobs listed after this job ID (optional)
+            command_width: Maximum characters of command to return
+            error_width: Maximum characters of last_error to return
+        
+        Returns:
+            List of job dictionaries with id, command, state, attempts,
+            max_retries, next_run_at, updated_at and last_error
+        """
+        columns = f"""
+            id,
+            substr(command, 1, {int(command_width)}) AS command,
+            state,
+            attempts,
+            max_retries,
+            substr(next_run_at, 1, 19) AS next_run_at,
+            substr(updated_at, 1, 19) AS updated_at,
+            substr(coalesce(last_error, ''), 1, {int(error_width)}) AS last_error
+        """
+        return self._list(columns, state, limit, before)
+    
+    def _list(self, columns: str, state: Optional[str], limit: int,
+              before: Optional[str]) -> List[Dict[str, Any]]:
+        """Run a filtered, keyset-paginated job listing query."""
+        clauses = []
+        params: List[Any] = []
+        
+        if state:
+            clauses.append("state = ?")
+            params.append(state)
+        
+        if before:
+            clauses.append("(created_at, id) < (SELECT created_at, id FROM jobs WHERE id = ?)")
+            params.append(before)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        
         with self.get_connection() as conn:
-            if state:
-                cursor = conn.execute("""
-                    SELECT * FROM jobs 
-                    WHERE state = ? 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (state, limit))
-            else:
-                cursor = conn.execute("""
-                    SELECT * FROM jobs 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (limit,))
-            
-            return [dict(row) for row in cursor.fetchall()]
+            return self._fetch_dicts(conn, f"""
+                SELECT {columns} FROM jobs
+                {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, params)
+    
+    @staticmethod
+    def _query(conn: sqlite3.Connection, sql: str, params=()):
+        """
+        Run a statement on a plain-tuple cursor.
+        
+        Returns the cursor and the row adapter for its result columns,
+        so rows become dicts without building a sqlite3.Row first.
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        return cursor, _row_adapter(tuple(d[0] for d in cursor.description))
+    
+    @classmethod
+    def _fetch_dicts(cls, conn: sqlite3.Connection, sql: str, params=()) -> List[Dict[str, Any]]:
+        """Run a query and return its rows as dicts."""
+        cursor, adapt = cls._query(conn, sql, params)
+        return list(map(adapt, cursor.fetchall()))
+    
+    @classmethod
+    def _fetch_dict(cls, conn: sqlite3.Connection, sql: str, params=()) -> Optional[Dict[str, Any]]:
+        """Run a statement and return its first row as a dict, or None."""
+        cursor, adapt = cls._query(conn, sql, params)
+        row = cursor.fetchone()
+        return adapt(row) if row is not None else None
     
     def get_job_counts(self) -> Dict[str, int]:
-        """Get count of jobs by state."""
+        """Get count of jobs by state (one GROUP BY over the state index)."""
         with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT state, COUNT(*) as count 
-                FROM jobs 
-                GROUP BY state
-            """)
-            counts = {row['state']: row['count'] for row in cursor.fetchall()}
-            
-            # Ensure all states are present
-            for state in ['pending', 'processing', 'completed', 'failed', 'dead']:
-                counts.setdefault(state, 0)
-            
-            return counts
+            return dict(conn.execute(_SQL_COUNT_BY_STATE).fetchall())
     
     def retry_dlq_job(self, job_id: str, reset_attempts: bool = True):
         """
@@ -311,30 +1138,18 @@ class Storage:
             reset_attempts: Whether to reset attempt counter
         """
         with self.get_connection() as conn:
-            now = datetime.now(timezone.utc).isoformat()
+            now_ts = time.time()
+            now = _iso(now_ts)
+            params = (now, _ms(now_ts), now, job_id)
             
             if reset_attempts:
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = 'pending',
-                        attempts = 0,
-                        next_run_at = ?,
-                        updated_at = ?,
-                        last_error = NULL
-                    WHERE id = ? AND state = 'dead'
-                """, (now, now, job_id))
+                cursor = conn.execute(_SQL_RETRY_DLQ_RESET, params)
             else:
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = 'pending',
-                        next_run_at = ?,
-                        updated_at = ?,
-                        last_error = NULL
-                    WHERE id = ? AND state = 'dead'
-                """, (now, now, job_id))
+                cursor = conn.execute(_SQL_RETRY_DLQ, params)
             
-            if conn.total_changes > 0:
-                conn.commit()
+            if cursor.rowcount > 0:
+                self._commit(conn)
+                self._notify_work()
                 logger.info(f"Job retried from DLQ: {job_id}")
                 return True
             else:
@@ -344,77 +1159,131 @@ class Storage:
     def delete_dlq_job(self, job_id: str) -> bool:
         """Delete a job from the Dead Letter Queue."""
         with self.get_connection() as conn:
-            conn.execute("""
-                DELETE FROM jobs WHERE id = ? AND state = 'dead'
-            """, (job_id,))
+            cursor = conn.execute(_SQL_DELETE_DLQ, (job_id,))
             
-            if conn.total_changes > 0:
-                conn.commit()
+            if cursor.rowcount > 0:
+                self._commit(conn)
                 logger.info(f"Job deleted from DLQ: {job_id}")
                 return True
             else:
                 logger.warning(f"Job not found in DLQ: {job_id}")
                 return False
     
-    def recover_abandoned_jobs(self, threshold_seconds: int = 3600):
+    def recover_abandoned_jobs(self, threshold_seconds: int = 3600) -> List[str]:
         """
         Recover jobs that have been processing for too long (likely abandoned).
         
         Args:
             threshold_seconds: Time threshold for considering a job abandoned
+        
+        Returns:
+            IDs of the jobs moved back to pending
         """
         with self.get_connection() as conn:
-            cutoff = (datetime.now(timezone.utc) - 
-                     timedelta(seconds=threshold_seconds)).isoformat()
+            cutoff = _iso(time.time() - threshold_seconds)
             
-            cursor = conn.execute("""
-                SELECT id, locked_by FROM jobs
-                WHERE state = 'processing'
-                AND locked_at < ?
-            """, (cutoff,))
+            # One statement finds and releases the jobs, so a job cannot
+            # change state between a SELECT and the UPDATE
+            abandoned_ids = [
+                row['id'] for row in conn.execute(_SQL_RECOVER_ABANDONED, (cutoff,)).fetchall()
+            ]
+            self._commit(conn)
             
-            abandoned_jobs = cursor.fetchall()
+            if abandoned_ids:
+                logger.warning(f"Recovered {len(abandoned_ids)} abandoned jobs")
+                for job_id in abandoned_ids:
+                    logger.info(f"  - Job {job_id}")
             
-            if abandoned_jobs:
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = 'pending',
-                        locked_by = NULL,
-                        locked_at = NULL
-                    WHERE state = 'processing'
-                    AND locked_at < ?
-                """, (cutoff,))
-                conn.commit()
-                
-                logger.warning(f"Recovered {len(abandoned_jobs)} abandoned jobs")
-                for job in abandoned_jobs:
-                    logger.info(f"  - Job {job['id']} (was locked by {job['locked_by']})")
+            return abandoned_ids
+    
+    def _change_token(self) -> tuple:
+        """Fingerprint of the database files; any commit changes it."""
+        token = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                token.append(None)
+            else:
+                token.append((st.st_mtime_ns, st.st_size))
+        return tuple(token)
+    
+    def wait_for_change(self, timeout: float, interval: float = 0.05,
+                        stop: Optional[Callable[[], bool]] = None,
+                        wakeup_fd: Optional[int] = None) -> bool:
+        """
+        Sleep until the database is written to, or until timeout.
+        
+        Commits append to the WAL file, so watching its size and mtime
+        (a stat call, no SQLite lock) lets idle workers notice new jobs
+        within `interval` instead of re-running acquire_job every poll.
+        Worker heartbeats live in the sidecar database and do not count.
+        Enqueues and DLQ retries also write to the notify FIFO (see
+        `notify_path`), which ends the wait immediately.
+        
+        Args:
+            timeout: Maximum seconds to wait (the fallback poll interval)
+            interval: Seconds between file checks
+            stop: Return early once this returns True (optional)
+            wakeup_fd: Non-blocking read end of a `signal.set_wakeup_fd`
+                pipe (optional). A signal then cuts the current sleep
+                short, so `stop` is checked right after its handler runs.
+        
+        Returns:
+            True if the database changed, False on timeout or stop
+        """
+        token = self._change_token()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop is not None and stop()):
+                return False
+            notify_fd = self._notify_reader()
+            fds = [fd for fd in (wakeup_fd, notify_fd) if fd is not None]
+            if not fds:
+                time.sleep(min(interval, remaining))
+            else:
+                ready = select.select(fds, [], [], min(interval, remaining))[0]
+                for fd in ready:
+                    _drain(fd)
+                if notify_fd is not None and notify_fd in ready:
+                    return True
+                if ready:
+                    continue
+            if self._change_token() != token:
+                return True
     
     # Configuration methods
     
     def set_config(self, key: str, value: str):
         """Set a configuration value."""
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO config (key, value)
-                VALUES (?, ?)
-            """, (key, value))
-            conn.commit()
+            conn.execute(_SQL_SET_CONFIG, (key, value))
+            self._commit(conn)
             logger.info(f"Config set: {key} = {value}")
     
     def get_config(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """Get a configuration value."""
         with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT value FROM config WHERE key = ?
-            """, (key,))
+            cursor = conn.execute(_SQL_GET_CONFIG, (key,))
             row = cursor.fetchone()
             return row['value'] if row else default
     
+    def get_config_many(self, keys: List[str]) -> Dict[str, str]:
+        """Get several configuration values in one query (missing keys omitted)."""
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" for _ in keys)
+        with self.get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT key, value FROM config WHERE key IN ({placeholders})
+            """, list(keys))
+            return {row['key']: row['value'] for row in cursor.fetchall()}
+    
     def get_all_config(self) -> Dict[str, str]:
         """Get all configuration values."""
         with self.get_connection() as conn:
-            cursor = conn.execute("SELECT key, value FROM config")
+            cursor = conn.execute(_SQL_ALL_CONFIG)
             return {row['key']: row['value'] for row in cursor.fetchall()}
     
     # Worker management methods
@@ -422,32 +1291,37 @@ class Storage:
     def register_worker(self, worker_id: str, pid: int):
         """Register a worker."""
         with self.get_connection() as conn:
-            now = datetime.now(timezone.utc).isoformat()
-            conn.execute("""
-                INSERT OR REPLACE INTO workers (worker_id, pid, started_at, last_heartbeat)
-                VALUES (?, ?, ?, ?)
-            """, (worker_id, pid, now, now))
-            conn.commit()
+            now = _now_iso()
+            conn.execute(_SQL_REGISTER_WORKER, (worker_id, pid, now, now))
+            self._commit(conn)
             logger.info(f"Worker registered: {worker_id} (PID: {pid})")
     
     def unregister_worker(self, worker_id: str):
         """Unregister a worker."""
         with self.get_connection() as conn:
-            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
-            conn.commit()
+            conn.execute(_SQL_UNREGISTER_WORKER, (worker_id,))
+            self._commit(conn)
             logger.info(f"Worker unregistered: {worker_id}")
     
     def update_worker_heartbeat(self, worker_id: str):
         """Update worker heartbeat."""
+        self.update_worker_heartbeats([worker_id])
+    
+    def update_worker_heartbeats(self, worker_ids: List[str]):
+        """Update the heartbeat of several workers in one transaction."""
         with self.get_connection() as conn:
-            now = datetime.now(timezone.utc).isoformat()
-            conn.execute("""
-                UPDATE workers SET last_heartbeat = ? WHERE worker_id = ?
-            """, (now, worker_id))
-            conn.commit()
+            now = _now_iso()
+            conn.executemany(_SQL_HEARTBEAT, [(now, worker_id) for worker_id in worker_ids])
+            self._commit(conn)
     
     def get_active_workers(self) -> List[Dict[str, Any]]:
         """Get list of active workers."""
         with self.get_connection() as conn:
-            cursor = conn.execute("SELECT * FROM workers ORDER BY started_at")
-            return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+            try:
+                return self._fetch_dicts(conn, _SQL_ACTIVE_WORKERS)
+            except sqlite3.OperationalError as e:
+                # The workers database is created by bootstrap; opened
+                # without one (deleted, or never started) there are none
+                if 'no such table' not in str(e):
+                    raise
+                return []
\ No newline at end of file
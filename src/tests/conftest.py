@@ -0,0 +1,22 @@
+"""
+Shared fixtures for QueueCTL tests.
+"""
+
+import pytest
+import tempfile
+from pathlib import Path
+from src.storage import Storage, notify_path, workers_db_path
+
+
+@pytest.fixture
+def temp_db():
+    """Create a temporary SQLite database for testing."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+    storage = Storage(db_path)
+    storage.init_db()
+    yield storage
+    storage.close()
+    Path(db_path).unlink(missing_ok=True)
+    Path(workers_db_path(db_path)).unlink(missing_ok=True)
+    Path(notify_path(db_path)).unlink(missing_ok=True)
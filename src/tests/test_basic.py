@@ -2,25 +2,6 @@
 Basic functionality tests for QueueCTL.
 """
 
-import pytest
-import tempfile
-import os
-import time
-from pathlib import Path
-from src.storage import Storage
-from src.executor import Executor
-
-
-@pytest.fixture
-def temp_db():
-    """Create a temporary SQLite database for testing."""
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
-    storage = Storage(db_path)
-    storage.init_db()
-    yield storage
-    Path(db_path).unlink(missing_ok=True)
-
 
 def test_database_initialization(temp_db):
     """Ensure all required tables exist."""
@@ -29,9 +10,14 @@ def test_database_initialization(temp_db):
             "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
         )
         tables = [row['name'] for row in cursor.fetchall()]
+        cursor = conn.execute(
+            "SELECT name FROM ephemeral.sqlite_master WHERE type='table'"
+        )
+        ephemeral_tables = [row['name'] for row in cursor.fetchall()]
     assert 'jobs' in tables
     assert 'config' in tables
-    assert 'workers' in tables
+    assert 'workers' not in tables
+    assert 'workers' in ephemeral_tables
 
 
 def test_enqueue_and_get_job(temp_db):
@@ -104,12 +90,3 @@ def test_dlq_retry_and_delete(temp_db):
     temp_db.update_job_failure('dlq1', "final fail", backoff_base=2)
     temp_db.update_job_failure('dlq1', "final fail2", backoff_base=2)
     assert temp_db.delete_dlq_job('dlq1') is True
-
-
-def test_executor_success_and_fail():
-    """Verify Executor behavior for success/failure."""
-    ex = Executor()
-    res1 = ex.execute('echo "OK"')
-    assert res1.returncode == 0
-    res2 = ex.execute('exit 1')
-    assert res2.returncode != 0
@@ -0,0 +1,242 @@
+"""
+Command-line interface tests for QueueCTL.
+"""
+
+import pytest
+import os
+import time
+from pathlib import Path
+
+
+def test_simple_table_alignment():
+    """Numeric columns right-align, text columns left-align."""
+    from src._fmt import simple_table
+    out = simple_table([['Pending', 3], ['Total', 12345]], headers=['State', 'Count'])
+    assert out.splitlines() == [
+        'State      Count',
+        '-------  -------',
+        'Pending        3',
+        'Total      12345',
+    ]
+
+
+def _open_db_fds(db_path):
+    """Paths of this process's open descriptors that belong to the database."""
+    fd_dir = Path('/proc/self/fd')
+    paths = []
+    for fd in fd_dir.iterdir():
+        try:
+            target = os.readlink(fd)
+        except OSError:
+            continue
+        if target.startswith(str(db_path)):
+            paths.append(target)
+    return paths
+
+
+@pytest.mark.skipif(not Path('/proc/self/fd').exists(), reason="needs /proc")
+def test_cli_worker_start_child_inherits_no_db_fds(tmp_path, monkeypatch):
+    """Forked workers start with no database descriptors from the CLI process."""
+    import json
+    from click.testing import CliRunner
+    from src.cli import cli
+    from src.worker import WorkerManager
+    monkeypatch.chdir(tmp_path)
+    db_path = tmp_path / 'q.db'
+    report = tmp_path / 'child_fds.json'
+
+    def record_fds(self, worker_id, cpu=None):
+        report.write_text(json.dumps(_open_db_fds(db_path)))
+
+    monkeypatch.setattr(WorkerManager, '_run_worker', record_fds)
+    result = CliRunner().invoke(cli, ['--db', str(db_path), 'worker', 'start', '--count', '1'])
+    assert result.exit_code == 0, result.output
+    assert json.loads(report.read_text()) == []
+
+
+@pytest.fixture(params=['schema', 'fallback'])
+def validate_job(request, monkeypatch):
+    """_validate_job with fastjsonschema (when installed) and without it."""
+    import src.cli as cli_module
+    if request.param == 'schema':
+        pytest.importorskip('fastjsonschema')
+    else:
+        monkeypatch.setattr(cli_module, 'fastjsonschema', None)
+    return cli_module._validate_job
+
+
+def test_validate_job_max_retries_types(validate_job):
+    """Both validation paths reject booleans and normalize integral floats to int."""
+    job = {'id': 'v1', 'command': 'echo', 'max_retries': 2.0}
+    assert validate_job(job) is None
+    assert job['max_retries'] == 2 and type(job['max_retries']) is int
+
+    for bad in (True, False, 2.5, -1, '3'):
+        assert validate_job({'id': 'v2', 'command': 'echo', 'max_retries': bad}) is not None
+    assert validate_job({'id': 'v3', 'command': 'echo', 'max_retries': 0}) is None
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def json_backend(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the stdlib json fallback."""
+    import src.utils as utils_module
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(utils_module, 'orjson', None)
+    return request.param
+
+
+def test_cli_enqueue_rejects_non_utf8_file(temp_db, tmp_path, json_backend):
+    """A job file that is not UTF-8 gets the invalid-JSON message, not a traceback."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    bad = tmp_path / 'latin1.json'
+    bad.write_bytes('{"id": "café", "command": "echo"}'.encode('latin-1'))
+    result = CliRunner().invoke(cli, ['--db', temp_db.db_path, 'enqueue', '--file', str(bad)])
+    assert result.exit_code == 1
+    assert "✗ Invalid JSON" in result.output
+    assert not isinstance(result.exception, UnicodeDecodeError)
+
+
+def test_cli_enqueue_json_array(temp_db):
+    """A JSON array is enqueued in one batch; a duplicate ID rejects the whole batch."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    runner = CliRunner()
+    jobs = '[{"id":"a1","command":"echo a"},{"id":"a2","command":"echo b","max_retries":1}]'
+    result = runner.invoke(cli, ['--db', temp_db.db_path, 'enqueue', jobs])
+    assert result.exit_code == 0, result.output
+    assert "✓ 2 jobs enqueued" in result.output
+    assert temp_db.get_job('a1')['max_retries'] == 3
+    assert temp_db.get_job('a2')['max_retries'] == 1
+
+    dup = '[{"id":"a3","command":"echo"},{"id":"a1","command":"echo"}]'
+    result = runner.invoke(cli, ['--db', temp_db.db_path, 'enqueue', dup])
+    assert result.exit_code == 1
+    assert "nothing enqueued" in result.output
+    assert temp_db.get_job('a3') is None
+
+
+def test_cli_worker_start_reads_defaults_from_config(temp_db, monkeypatch):
+    """Without --count/--base, `worker start` uses the configured defaults."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    from src.worker import WorkerManager
+    temp_db.set_config('worker_default_count', '3')
+    temp_db.set_config('backoff_base', '5')
+    started = []
+    monkeypatch.setattr(WorkerManager, 'start', lambda self: started.append((self.worker_count, self.backoff_base)))
+
+    result = CliRunner().invoke(cli, ['--db', temp_db.db_path, 'worker', 'start'])
+    assert result.exit_code == 0, result.output
+    assert started == [(3, 5)]
+
+    result = CliRunner().invoke(cli, ['--db', temp_db.db_path, 'worker', 'start', '--count', '2'])
+    assert started[-1] == (2, 5)
+
+
+def _run_stop(tmp_path, monkeypatch, pid):
+    from click.testing import CliRunner
+    from src.cli import cli
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.queuectl.pid').write_text(str(pid))
+    return CliRunner().invoke(cli, ['--db', str(tmp_path / 'q.db'), 'worker', 'stop'])
+
+
+def test_cli_stop_without_pidfile(tmp_path, monkeypatch):
+    """`worker stop` with no PID file reports that no workers are running."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(cli, ['--db', str(tmp_path / 'q.db'), 'worker', 'stop'])
+    assert result.exit_code == 1
+    assert "PID file not found" in result.output
+
+
+def test_cli_stop_removes_pidfile_of_dead_process(tmp_path, monkeypatch):
+    """A PID file naming an exited process is removed without signalling anything."""
+    import subprocess
+    import sys
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    result = _run_stop(tmp_path, monkeypatch, proc.pid)
+    assert result.exit_code == 1
+    assert "removed stale PID file" in result.output
+    assert not (tmp_path / '.queuectl.pid').exists()
+
+
+@pytest.mark.skipif(not Path('/proc/self/comm').exists(), reason="needs /proc")
+def test_cli_stop_ignores_reused_pid(tmp_path, monkeypatch):
+    """A PID now owned by a non-queuectl program is never signalled."""
+    import subprocess
+    proc = subprocess.Popen(['sleep', '30'])
+    comm = Path(f'/proc/{proc.pid}/comm')
+    deadline = time.monotonic() + 5
+    while comm.read_text().strip() != 'sleep' and time.monotonic() < deadline:
+        time.sleep(0.01)  # until exec replaces the forked Python image
+    try:
+        result = _run_stop(tmp_path, monkeypatch, proc.pid)
+        assert result.exit_code == 1
+        assert f"PID {proc.pid} is not a queuectl process" in result.output
+        assert not (tmp_path / '.queuectl.pid').exists()
+        assert proc.poll() is None
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_cli_stop_signals_live_manager(tmp_path, monkeypatch):
+    """A live Python process named in the PID file receives SIGTERM."""
+    import signal
+    import subprocess
+    import sys
+    proc = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        time.sleep(0.2)
+        result = _run_stop(tmp_path, monkeypatch, proc.pid)
+        assert result.exit_code == 0, result.output
+        assert "✓ Sent stop signal" in result.output
+        assert proc.wait(timeout=5) == -signal.SIGTERM
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_cli_read_commands_skip_schema_setup(temp_db, monkeypatch):
+    """Read-only commands open the database as-is; only init, enqueue and start bootstrap."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    from src.storage import Storage, _ConnectionPool
+    temp_db.enqueue_job({'id': 'r1', 'command': 'echo'})
+    statements = []
+    real_connect = _ConnectionPool._connect
+
+    def traced_connect(self):
+        conn = real_connect(self)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    def no_bootstrap(self):
+        raise AssertionError("init_db called")
+
+    monkeypatch.setattr(_ConnectionPool, '_connect', traced_connect)
+    monkeypatch.setattr(Storage, 'init_db', no_bootstrap)
+    runner = CliRunner()
+    for args in (['status'], ['list'], ['dlq', 'list'], ['config', 'show']):
+        result = runner.invoke(cli, ['--db', temp_db.db_path, *args])
+        assert result.exit_code == 0, result.output
+    assert statements
+    assert not [sql for sql in statements
+                if sql.lstrip().upper().startswith(('CREATE', 'ALTER', 'UPDATE', 'PRAGMA JOURNAL_MODE'))]
+
+
+def test_cli_status_without_database(tmp_path):
+    """Read-only commands do not create a missing database."""
+    from click.testing import CliRunner
+    from src.cli import cli
+    db_path = tmp_path / 'missing.db'
+    result = CliRunner().invoke(cli, ['--db', str(db_path), 'status'])
+    assert result.exit_code == 1
+    assert "run 'queuectl init' first" in result.output
+    assert not db_path.exists()
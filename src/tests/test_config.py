@@ -0,0 +1,77 @@
+"""
+Configuration tests for QueueCTL.
+"""
+
+from src.storage import Storage
+from src.config import Config, DEFAULT_CONFIG
+
+
+def test_defaults_not_persisted(tmp_path):
+    """Reading config must not write defaults to the database."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    cfg = Config(s)
+    assert cfg.get_int('max_retries', 0) == int(DEFAULT_CONFIG['max_retries'])
+    assert cfg.get_all()['backoff_base'] == DEFAULT_CONFIG['backoff_base']
+    assert s.get_all_config() == {}
+
+
+def test_set_overrides_default(tmp_path):
+    """Explicitly set values win over defaults and survive a new instance."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    cfg = Config(s)
+    cfg.get('backoff_base')
+    cfg.set('backoff_base', 5)
+    assert cfg.get_int('backoff_base', 2) == 5
+    assert Config(s).get_int('backoff_base', 2) == 5
+    assert s.get_all_config() == {'backoff_base': '5'}
+
+
+def test_preloaded_keys(tmp_path):
+    """A Config limited to some keys reads only those from the database."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    s.set_config('backoff_base', '7')
+    s.set_config('poll_interval', '9')
+    assert s.get_config_many(['backoff_base', 'missing']) == {'backoff_base': '7'}
+
+    cfg = Config(s, keys=['backoff_base'])
+    assert cfg.get_int('backoff_base', 2) == 7
+    assert cfg.get('poll_interval') == DEFAULT_CONFIG['poll_interval']
+    assert cfg.get_all()['poll_interval'] == '9'
+
+
+def test_numeric_cache_invalidated_by_set(tmp_path):
+    """Parsed int/float values are cached until the key is set again."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    cfg = Config(s)
+    assert cfg.get_float('poll_interval', 0.0) == 1.0
+    assert cfg.get_int('backoff_base', 0) == 2
+    assert cfg._int_cache == {'backoff_base': 2}
+
+    cfg.set('poll_interval', '0.5')
+    cfg.set('backoff_base', 'bogus')
+    assert cfg.get_float('poll_interval', 1.0) == 0.5
+    assert cfg.get_int('backoff_base', 3) == 3
+
+
+def test_reload_picks_up_external_changes(tmp_path):
+    """Values written by another process are seen only after reload()."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    cfg = Config(s)
+    assert cfg.get_float('poll_interval', 0.0) == 1.0
+
+    s.set_config('poll_interval', '0.25')
+    s.set_config('log_dir', 'logs')
+    assert cfg.get_float('poll_interval', 0.0) == 1.0
+    assert cfg.get('log_dir') == ''
+    cfg.reload()
+    assert cfg.get_float('poll_interval', 0.0) == 0.25
+    assert cfg.get('log_dir') == 'logs'
+
+
+def test_get_bool(tmp_path):
+    """Boolean settings accept the usual spellings and default to off."""
+    s = Storage.bootstrap(str(tmp_path / "cfg.db"))
+    cfg = Config(s)
+    assert cfg.get_bool('worker_cpu_affinity', True) is False
+    cfg.set('worker_cpu_affinity', 'Yes')
+    assert cfg.get_bool('worker_cpu_affinity', False) is True
@@ -0,0 +1,68 @@
+"""
+Command execution tests for QueueCTL.
+"""
+
+from pathlib import Path
+from src.executor import Executor
+
+
+def test_executor_success_and_fail():
+    """Verify Executor behavior for success/failure."""
+    ex = Executor()
+    res1 = ex.execute('echo "OK"')
+    assert res1.returncode == 0
+    res2 = ex.execute('exit 1')
+    assert res2.returncode != 0
+
+
+def test_executor_output_cap():
+    """Captured output is truncated to max_output_bytes and decoded."""
+    ex = Executor(max_output_bytes=10)
+    res = ex.execute("printf 'x%.0s' $(seq 100); printf '\\377' >&2")
+    assert res.stdout == 'x' * 10
+    assert res.stderr == '�'
+
+
+def test_executor_direct_exec_fast_path():
+    """Simple commands skip the shell; shell syntax and builtins still work."""
+    ex = Executor()
+    assert ex._prepare('echo "a b"', None)[1] is False
+    assert ex._prepare('echo a | cat', None)[1] is True
+    assert ex._prepare('exit 3', None)[1] is True
+    assert ex._prepare('FOO=1 env', None)[1] is True
+    assert ex._prepare('echo a', True)[1] is True
+
+    assert ex.execute('echo "a  b"').stdout == 'a  b\n'
+    assert ex.execute('exit 3').returncode == 3
+    assert ex.execute('echo $((1+2))').stdout == '3\n'
+    assert ex.execute('echo a; echo b', shell=False).stdout == 'a; echo b\n'
+
+
+def test_executor_streams_output_to_log_dir(tmp_path):
+    """With log_dir, output goes to files and only the tail is kept."""
+    ex = Executor(log_dir=str(tmp_path), tail_bytes=5)
+    res = ex.execute("echo hello world; echo oops >&2", log_name='job/1')
+    assert res.returncode == 0
+    assert res.stdout == 'orld\n'
+    assert Path(res.stdout_path).read_text() == 'hello world\n'
+    assert Path(res.stderr_path).read_text() == 'oops\n'
+    assert Path(res.stdout_path).parent == tmp_path
+
+
+def test_executor_on_slow_callback():
+    """on_slow runs once while a slow command keeps running; failures in it are logged."""
+    ex = Executor()
+    calls = []
+    res = ex.execute('sleep 0.3; echo done', on_slow=lambda: calls.append(1), slow_after=0.05)
+    assert calls == [1]
+    assert res.stdout == 'done\n'
+
+    assert ex.execute('true', on_slow=lambda: calls.append(2), slow_after=5).returncode == 0
+    assert calls == [1]
+
+    def boom():
+        raise RuntimeError("flush failed")
+
+    res = ex.execute('sleep 0.2; exit 4', on_slow=boom, slow_after=0.05)
+    assert res.returncode == 4
+    assert Executor(timeout=1).execute('sleep 5', on_slow=lambda: None, slow_after=0.1).returncode == -1
@@ -4,6 +4,7 @@ Concurrent worker processing tests (simulated multi-worker non-overlap).
 
 import pytest
 import tempfile
+import os
 import time
 import multiprocessing as mp
 from src.storage import Storage
@@ -11,10 +12,10 @@ from src.storage import Storage
 
 def worker_func(db_path, worker_id, processed_ids):
     s = Storage(db_path)
-    job = s.acquire_job(worker_id)
-    if job:
-        processed_ids.append(job['id'])
-        s.update_job_success(job['id'])
+    with s.job_session(worker_id) as (job, complete):
+        if job:
+            processed_ids.append(job['id'])
+            complete()
 
 
 @pytest.fixture
@@ -42,3 +43,255 @@ def test_multiworker_no_overlap(db_path):
     # Each job should be processed exactly once
     assert len(processed) == 5
     assert len(set(processed)) == 5
+
+
+def test_idle_backoff_full_jitter():
+    """Idle delays stay within the doubling cap, seeded per worker id."""
+    from src.worker import Worker
+    w = Worker('w1', ':memory:', 2)
+    caps = [min(5.0, 0.5 * (1 << n)) for n in range(1, 8)]
+    delays = [w._idle_delay(0.5, 5.0) for _ in caps]
+    assert all(0 <= d <= cap for d, cap in zip(delays, caps))
+    # Same worker id, same sequence; different ids desynchronize
+    w2 = Worker('w1', ':memory:', 2)
+    assert [w2._idle_delay(0.5, 5.0) for _ in caps] == delays
+    w3 = Worker('w2', ':memory:', 2)
+    assert [w3._idle_delay(0.5, 5.0) for _ in caps] != delays
+
+
+def test_manager_waits_for_all_worker_sentinels(db_path):
+    """WorkerManager reaps every worker and returns once all have exited."""
+    from src.worker import WorkerManager
+    manager = WorkerManager(db_path)
+    manager.processes = [mp.Process(target=time.sleep, args=(d,)) for d in (0.3, 0.0, 0.1)]
+    [p.start() for p in manager.processes]
+    manager._wait_for_workers()
+    assert all(p.exitcode == 0 for p in manager.processes)
+
+
+def _ignore_sigterm_and_sleep(seconds):
+    import signal
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(seconds)
+
+
+def test_wait_for_workers_shares_one_deadline(db_path):
+    """A timed wait returns every unfinished worker once one shared deadline passes."""
+    from src.worker import WorkerManager
+    manager = WorkerManager(db_path)
+    manager.processes = [mp.Process(target=_ignore_sigterm_and_sleep, args=(30,)) for _ in range(3)]
+    [p.start() for p in manager.processes]
+    time.sleep(0.2)
+    start = time.monotonic()
+    assert len(manager._wait_for_workers(timeout=0.3)) == 3
+    assert time.monotonic() - start < 2.0
+    for p in manager.processes:
+        p.kill()
+        p.join()
+
+
+def test_pidfile_written_atomically_and_removed_only_if_ours(tmp_path):
+    """The PID file is replaced in one step and left alone once another manager owns it."""
+    import os
+    from src.worker import _write_pidfile, _remove_pidfile
+    pidfile = tmp_path / '.queuectl.pid'
+    _write_pidfile(pidfile)
+    assert pidfile.read_text() == str(os.getpid())
+    assert [p.name for p in tmp_path.iterdir()] == ['.queuectl.pid']
+
+    pidfile.write_text('999999')
+    _remove_pidfile(pidfile)
+    assert pidfile.exists()
+
+    _write_pidfile(pidfile)
+    _remove_pidfile(pidfile)
+    assert not pidfile.exists()
+    _remove_pidfile(pidfile)
+
+
+def _run_worker_process(db_path, job_limit=None, flush_log=None):
+    """Run Worker.run in a forked child and wait for it to finish."""
+    import json
+    from src.worker import Worker
+
+    def target():
+        if flush_log is not None:
+            sizes = []
+            original = Worker._flush_results
+
+            def recording_flush(self, storage, now=None):
+                if self._pending_success or self._pending_failure:
+                    sizes.append(len(self._pending_success) + len(self._pending_failure))
+                return original(self, storage, now)
+
+            Worker._flush_results = recording_flush
+        try:
+            Worker('w-e2e', db_path, 2, job_limit).run()
+        finally:
+            if flush_log is not None:
+                flush_log.write_text(json.dumps(sizes))
+
+    p = mp.get_context('fork').Process(target=target)
+    p.start()
+    p.join(timeout=60)
+    assert p.exitcode == 0
+
+
+def test_worker_run_batch_claims_respect_job_limit(db_path):
+    """With job_limit below the claim batch, only that many jobs are claimed and all finish."""
+    s = Storage.bootstrap(db_path)
+    s.enqueue_jobs_bulk([{'id': f'l{i:02d}', 'command': 'true'} for i in range(12)])
+    _run_worker_process(db_path, job_limit=5)
+
+    states = {j['id']: j['state'] for j in s.list_jobs(limit=-1)}
+    assert sorted(i for i, st in states.items() if st == 'completed') == [f'l{i:02d}' for i in range(5)]
+    assert list(states.values()).count('pending') == 7
+    assert 'processing' not in states.values()
+
+
+def test_worker_run_releases_unstarted_claims_on_shutdown(db_path):
+    """Jobs claimed in a batch but not started when the worker stops go back to pending."""
+    s = Storage.bootstrap(db_path)
+    jobs = [{'id': f's{i}', 'command': 'true'} for i in range(8)]
+    # Claims grow 1, 2, then 8 jobs; s4 stops the worker mid-batch
+    jobs[4]['command'] = 'kill -TERM $PPID'
+    s.enqueue_jobs_bulk(jobs)
+    _run_worker_process(db_path)
+
+    by_id = {j['id']: j for j in s.list_jobs(limit=-1)}
+    assert [by_id[f's{i}']['state'] for i in range(5)] == ['completed'] * 5
+    assert [by_id[f's{i}']['state'] for i in range(5, 8)] == ['pending'] * 3
+    assert all(by_id[f's{i}']['attempts'] == 0 for i in range(5, 8))
+    assert not s.get_active_workers()
+
+
+def test_worker_run_flushes_buffered_results(db_path, tmp_path):
+    """Buffered results are written at the size and age thresholds and on shutdown."""
+    import json
+    from src.worker import RESULT_FLUSH_SIZE
+    s = Storage.bootstrap(db_path)
+    fast = [{'id': f'f{i:02d}', 'command': 'true'} for i in range(RESULT_FLUSH_SIZE + 8)]
+    # Short enough to stay below FAST_JOB_NS, long enough to age the buffer
+    paced = [{'id': f'p{i}', 'command': 'sleep 0.15'} for i in range(5)]
+    failing = [{'id': 'x', 'command': 'false', 'max_retries': 1}]
+    s.enqueue_jobs_bulk(fast + paced + failing)
+    flush_log = tmp_path / 'flushes.json'
+    _run_worker_process(db_path, job_limit=len(fast) + len(paced) + 1, flush_log=flush_log)
+
+    sizes = json.loads(flush_log.read_text())
+    # A full buffer, then at least one age-triggered flush before the final one
+    assert RESULT_FLUSH_SIZE in sizes
+    assert len(sizes) >= 3
+    assert sum(sizes) == len(fast) + len(paced) + 1
+
+    states = {j['id']: j['state'] for j in s.list_jobs(limit=-1)}
+    assert states.pop('x') == 'dead'
+    assert set(states.values()) == {'completed'}
+
+
+def test_result_flushes_write_heartbeat_only_when_due(temp_db):
+    """Flushing results carries a heartbeat along only once heartbeat_interval has passed."""
+    from src.worker import Worker
+    temp_db.register_worker('w1', 1)
+    beats = []
+    real_heartbeat = temp_db.update_worker_heartbeat
+    temp_db.update_worker_heartbeat = lambda worker_id: (beats.append(worker_id), real_heartbeat(worker_id))
+
+    w = Worker('w1', temp_db.db_path, 2)
+    w._heartbeat_interval = 10.0
+    w._last_hb = 100.0
+    temp_db.enqueue_jobs_bulk([{'id': f'h{i}', 'command': 'echo'} for i in range(5)])
+    for i, now in enumerate([101.0, 102.0, 105.0, 110.0, 111.0]):
+        w._pending_success.append(f'h{i}')
+        w._flush_results(temp_db, now)
+
+    assert beats == ['w1']
+    assert w._last_hb == 110.0
+
+
+def _listen_on_notify_fifo(self, worker_id, cpu=None):
+    Storage(self.db_path)._notify_reader()
+
+
+def test_manager_removes_notify_fifo_on_exit(db_path, tmp_path, monkeypatch):
+    """The notify FIFO created by idle workers is removed once the manager exits."""
+    import stat
+    from src.storage import notify_path, remove_notify_fifo
+    from src.worker import WorkerManager
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(WorkerManager, '_run_worker', _listen_on_notify_fifo)
+    WorkerManager(db_path, worker_count=2).start()
+    assert not os.path.exists(notify_path(db_path))
+
+    # A regular file of the same name is not ours to remove
+    open(notify_path(db_path), 'w').close()
+    remove_notify_fifo(db_path)
+    assert stat.S_ISREG(os.stat(notify_path(db_path)).st_mode)
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/fd'), reason="needs /proc")
+def test_worker_run_restores_wakeup_fd_and_closes_pipe(db_path, tmp_path):
+    """Each run closes its signal self-pipe and puts back the host's wakeup fd."""
+    import json
+    import signal
+    from src.worker import Worker
+    s = Storage.bootstrap(db_path)
+    s.enqueue_jobs_bulk([{'id': f'u{i}', 'command': 'true'} for i in range(2)])
+    s.close()
+    report = tmp_path / 'wakeup.json'
+
+    def target():
+        r, w = os.pipe()
+        os.set_blocking(w, False)
+        signal.set_wakeup_fd(w)
+        before = sorted(os.listdir('/proc/self/fd'))
+        for _ in range(2):
+            Worker('w-pipe', db_path, 2, job_limit=1).run()
+        report.write_text(json.dumps({
+            'fds': sorted(os.listdir('/proc/self/fd')) == before,
+            'restored': signal.set_wakeup_fd(-1) == w,
+        }))
+
+    p = mp.get_context('fork').Process(target=target)
+    p.start()
+    p.join(timeout=60)
+    assert p.exitcode == 0
+    assert json.loads(report.read_text()) == {'fds': True, 'restored': True}
+
+
+def test_worker_reload_switches_log_dir(db_path, tmp_path):
+    """Reloaded settings send job output to the newly configured log_dir."""
+    from src.config import Config
+    from src.worker import Worker
+    s = Storage.bootstrap(db_path)
+    config = Config(s)
+    w = Worker('w-reload', db_path, 2)
+    w._load_settings(config)
+    assert w._executor.log_dir is None
+
+    s.set_config('log_dir', str(tmp_path / 'logs'))
+    s.set_config('poll_max', '2.5')
+    config.reload()
+    w._load_settings(config)
+    assert w._poll_max == 2.5
+    assert w._executor.log_dir == tmp_path / 'logs'
+    assert w._executor.execute('echo hi').stdout_path.startswith(str(tmp_path / 'logs'))
+
+
+def test_worker_run_flushes_fast_result_during_slow_job(db_path):
+    """A quick job's result is written while a following slow job is still running."""
+    from src.worker import Worker
+    s = Storage.bootstrap(db_path)
+    s.enqueue_jobs_bulk([{'id': 'quick', 'command': 'true'}, {'id': 'slow', 'command': 'sleep 2'}])
+    p = mp.get_context('fork').Process(target=lambda: Worker('w-slow', db_path, 2, job_limit=2).run())
+    p.start()
+    try:
+        deadline = time.monotonic() + 1.5
+        while s.get_job('quick')['state'] != 'completed' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert s.get_job('quick')['state'] == 'completed'
+        assert s.get_job('slow')['state'] == 'processing'
+    finally:
+        p.join(timeout=30)
+    assert p.exitcode == 0
+    assert s.get_job('slow')['state'] == 'completed'
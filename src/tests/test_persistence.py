@@ -2,9 +2,13 @@
 Persistence tests for QueueCTL.
 """
 
+import pytest
 import tempfile
 import os
-from src.storage import Storage
+import sqlite3
+import time
+from pathlib import Path
+from src.storage import Storage, notify_path, workers_db_path
 
 
 def test_persistence_across_restart(tmp_path):
@@ -20,3 +24,521 @@ def test_persistence_across_restart(tmp_path):
     j = s2.get_job('p1')
     assert j is not None
     assert j['state'] == 'pending'
+
+
+def test_storage_open_does_not_run_ddl(tmp_path):
+    """Only bootstrap creates the schema; plain Storage() just opens it."""
+    db_path = str(tmp_path / "lazy.db")
+    s = Storage(db_path)
+    with s.get_connection() as conn:
+        assert conn.execute("SELECT count(*) FROM sqlite_master").fetchone()[0] == 0
+    s.close()
+
+    Storage.bootstrap(db_path).enqueue_job({'id': 'b1', 'command': 'echo'})
+    assert Storage(db_path).get_job('b1') is not None
+
+
+def test_rowid_jobs_table_is_rebuilt(tmp_path):
+    """Jobs from a database with the old rowid table survive the rebuild."""
+    import sqlite3
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, command TEXT NOT NULL, state TEXT NOT NULL,
+            attempts INTEGER DEFAULT 0, max_retries INTEGER DEFAULT 3,
+            created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+            next_run_at TEXT NOT NULL, last_error TEXT, locked_by TEXT,
+            locked_at TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO jobs (id, command, state, created_at, updated_at, next_run_at)
+        VALUES ('old1', 'echo', 'pending', 't', 't', 't')
+    """)
+    conn.commit()
+    conn.close()
+
+    s = Storage.bootstrap(db_path)
+    with s.get_connection() as c:
+        sql = c.execute("SELECT sql FROM sqlite_master WHERE name = 'jobs'").fetchone()[0]
+    assert 'WITHOUT ROWID' in sql
+    assert s.get_job('old1')['command'] == 'echo'
+    assert s.get_job('old1')['shell'] is None
+
+
+def test_next_run_at_ms_backfilled_once_on_migration(tmp_path):
+    """Adding next_run_at_ms backfills it; later bootstraps issue no writes."""
+    import sqlite3
+    db_path = str(tmp_path / "premigration.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, command TEXT NOT NULL, state TEXT NOT NULL,
+            attempts INTEGER DEFAULT 0, max_retries INTEGER DEFAULT 3,
+            created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+            next_run_at TEXT NOT NULL, last_error TEXT, locked_by TEXT,
+            locked_at TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO jobs (id, command, state, created_at, updated_at, next_run_at)
+        VALUES ('m1', 'echo', 'pending', 't', 't', '2000-01-01T00:00:00+00:00'),
+               ('m2', 'echo', 'pending', 't', 't', 'not a date')
+    """)
+    conn.commit()
+    conn.close()
+
+    s = Storage.bootstrap(db_path)
+    assert s.get_job('m1')['next_run_at_ms'] == 946684800000
+    assert s.get_job('m2')['next_run_at_ms'] is None
+    s.close()
+
+    statements = []
+    again = Storage(db_path)
+    with again.get_connection() as c:
+        c.set_trace_callback(statements.append)
+    again.init_db()
+    with again.get_connection() as c:
+        c.set_trace_callback(None)
+    writes = [sql for sql in statements
+              if sql.lstrip().split()[0].upper() in ('UPDATE', 'INSERT', 'DELETE', 'BEGIN', 'ALTER')]
+    assert writes == []
+    again.close()
+
+
+def test_wal_mode_set_once_at_bootstrap(tmp_path):
+    """WAL is persisted by bootstrap; plain opens leave the journal mode alone."""
+    fresh = Storage(str(tmp_path / "fresh.db"))
+    with fresh.get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+
+    db_path = str(tmp_path / "wal.db")
+    Storage.bootstrap(db_path).close()
+    with Storage(db_path).get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA ephemeral.journal_mode").fetchone()[0] == 'wal'
+
+
+def test_enqueue_jobs_bulk(temp_db):
+    """Bulk enqueue inserts every job, or none on a duplicate ID."""
+    jobs = [{'id': f'bulk{i}', 'command': 'echo 1'} for i in range(3)]
+    assert temp_db.enqueue_jobs_bulk(jobs)
+    assert temp_db.get_job_counts()['pending'] == 3
+
+    assert not temp_db.enqueue_jobs_bulk([
+        {'id': 'bulk-new', 'command': 'echo 2'},
+        {'id': 'bulk0', 'command': 'echo 3'},
+    ])
+    assert temp_db.get_job('bulk-new') is None
+
+
+def test_list_jobs_keyset_pagination(temp_db):
+    """Pages fetched with `before` cover every job exactly once."""
+    for i in range(5):
+        temp_db.enqueue_job({'id': f'p{i}', 'command': 'echo'})
+    seen = []
+    before = None
+    while True:
+        page = temp_db.list_jobs(limit=2, before=before)
+        if not page:
+            break
+        seen.extend(j['id'] for j in page)
+        before = page[-1]['id']
+    assert sorted(seen) == [f'p{i}' for i in range(5)]
+    assert len(temp_db.list_jobs(state='pending', limit=-1)) == 5
+
+
+def test_job_shell_flag_persisted(temp_db):
+    """The optional per-job shell flag round-trips through storage."""
+    temp_db.enqueue_job({'id': 'sh1', 'command': 'echo', 'shell': True})
+    temp_db.enqueue_job({'id': 'sh2', 'command': 'echo'})
+    assert temp_db.get_job('sh1')['shell'] == 1
+    assert temp_db.get_job('sh2')['shell'] is None
+
+
+def test_connection_pool_reuses_connections(temp_db):
+    """Connections are returned to the pool and reused, rolled back if dirty."""
+    with temp_db.get_connection() as conn:
+        conn.execute("INSERT INTO config (key, value) VALUES ('x', '1')")
+    with temp_db.get_connection() as again:
+        assert again is conn
+        assert not again.in_transaction
+    assert temp_db.get_config('x') is None
+
+    assert temp_db.delete_dlq_job('missing') is False
+
+
+def test_connection_pragmas(temp_db):
+    """Pooled connections are opened with the performance PRAGMAs."""
+    with temp_db.get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -64000
+
+
+def test_job_cycle_reuses_one_configured_connection(temp_db):
+    """A worker's per-job calls share one pooled connection and never re-run PRAGMAs."""
+    temp_db.register_worker('w1', 1)
+    statements = []
+    with temp_db.get_connection() as conn:
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 30000
+        conn.set_trace_callback(statements.append)
+    try:
+        for i in range(3):
+            temp_db.enqueue_job({'id': f'c{i}', 'command': 'echo'})
+            job = temp_db.acquire_job('w1')
+            temp_db.finish_job(job['id'], 'w1', attempts=job['attempts'], max_retries=job['max_retries'])
+    finally:
+        with temp_db.get_connection() as conn:
+            conn.set_trace_callback(None)
+
+    assert temp_db._pool._created == 1
+    assert statements
+    assert not [sql for sql in statements if sql.lstrip().upper().startswith('PRAGMA')]
+
+
+def test_iso_timestamps_match_datetime():
+    """The cached timestamp formatter agrees with datetime and sorts correctly."""
+    from datetime import datetime, timezone
+    from src.storage import _iso
+    stamps = [1700000000.0, 1700000000.25, 1700000000.999, 1700000001.5]
+    for ts in stamps:
+        parsed = datetime.fromisoformat(_iso(ts))
+        assert abs(parsed.timestamp() - ts) < 1e-5
+        assert parsed.tzinfo == timezone.utc
+    assert sorted(_iso(ts) for ts in stamps) == [_iso(ts) for ts in stamps]
+
+
+def test_batch_commits_once(temp_db):
+    """Writes inside batch() share one transaction."""
+    temp_db.enqueue_job({'id': 'b1', 'command': 'echo'})
+    temp_db.register_worker('w1', 1)
+    temp_db.acquire_job('w1')
+
+    with temp_db.batch():
+        temp_db.update_job_success('b1')
+        temp_db.update_worker_heartbeat('w1')
+        with temp_db.get_connection() as conn:
+            assert conn.in_transaction
+    assert temp_db.get_job('b1')['state'] == 'completed'
+
+    with pytest.raises(RuntimeError):
+        with temp_db.batch():
+            temp_db.set_config('k', 'v')
+            raise RuntimeError
+    assert temp_db.get_config('k') is None
+
+
+def test_acquire_uses_due_index(temp_db):
+    """Due-job lookups and abandoned-job recovery seek their partial indexes."""
+    from src.storage import _SQL_ACQUIRE, _SQL_HAS_DUE, _SQL_RECOVER_ABANDONED
+    with temp_db.get_connection() as conn:
+        for sql, params in ((_SQL_HAS_DUE, (0,)), (_SQL_ACQUIRE, ('w', 'now', 'now', 0, 1))):
+            plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            assert any('idx_jobs_due' in step and 'next_run_at_ms<' in step
+                       for step in plan), plan
+        plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + _SQL_RECOVER_ABANDONED, ('now',))]
+        assert any('idx_jobs_processing_lock' in step and 'locked_at<' in step for step in plan), plan
+
+
+def test_acquire_works_without_pending_index(temp_db):
+    """A database missing the partial indexes gets slower plans, not errors."""
+    temp_db.enqueue_job({'id': 'n1', 'command': 'echo'})
+    with temp_db.get_connection() as conn:
+        conn.execute("DROP INDEX idx_jobs_due")
+        conn.execute("DROP INDEX idx_jobs_processing_lock")
+        conn.commit()
+    assert temp_db.acquire_job('w1')['id'] == 'n1'
+    assert temp_db.recover_abandoned_jobs(-1) == ['n1']
+
+
+def test_update_job_failure_with_known_attempts(temp_db):
+    """Passing attempts/max_retries from the acquired job skips the lookup."""
+    temp_db.enqueue_job({'id': 'k1', 'command': 'exit 1', 'max_retries': 2})
+    job = temp_db.acquire_job('w1')
+    temp_db.update_job_failure('k1', 'boom', 2, attempts=job['attempts'],
+                               max_retries=job['max_retries'])
+    assert temp_db.get_job('k1')['state'] == 'failed'
+    temp_db.update_job_failure('k1', 'boom', 2, attempts=2, max_retries=2)
+    assert temp_db.get_job('k1')['state'] == 'dead'
+
+
+def test_recover_abandoned_jobs(temp_db):
+    """Jobs locked before the cutoff go back to pending in one statement."""
+    temp_db.enqueue_job({'id': 'ab1', 'command': 'sleep 1'})
+    temp_db.acquire_job('w1')
+    assert temp_db.recover_abandoned_jobs(3600) == []
+    assert temp_db.recover_abandoned_jobs(-1) == ['ab1']
+    j = temp_db.get_job('ab1')
+    assert j['state'] == 'pending'
+    assert j['locked_by'] is None
+
+
+def test_workers_in_ephemeral_database(temp_db):
+    """Worker heartbeats go to the sidecar database file."""
+    temp_db.register_worker('w1', 123)
+    temp_db.update_worker_heartbeat('w1')
+    assert [w['worker_id'] for w in temp_db.get_active_workers()] == ['w1']
+    assert Path(workers_db_path(temp_db.db_path)).exists()
+    temp_db.unregister_worker('w1')
+    assert temp_db.get_active_workers() == []
+
+
+def test_heartbeats_batched_and_time_gated(temp_db):
+    """Heartbeats can be written for many workers at once and are rate-limited per worker."""
+    from src.worker import Worker
+    temp_db.register_worker('w1', 1)
+    temp_db.register_worker('w2', 2)
+    with temp_db.get_connection() as conn:
+        conn.execute("UPDATE ephemeral.workers SET last_heartbeat = 'old'")
+        conn.commit()
+    temp_db.update_worker_heartbeats(['w1', 'w2'])
+    assert all(w['last_heartbeat'] != 'old' for w in temp_db.get_active_workers())
+
+    calls = []
+    temp_db.update_worker_heartbeat = calls.append
+    w = Worker('w1', temp_db.db_path, 2)
+    w._last_hb = 100.0
+    w._maybe_heartbeat(temp_db, 105.0, 10.0)
+    assert calls == []
+    w._maybe_heartbeat(temp_db, 110.0, 10.0)
+    w._maybe_heartbeat(temp_db, 115.0, 10.0)
+    assert calls == ['w1']
+
+
+def test_job_session_completes_on_pinned_connection(temp_db):
+    """job_session claims, then records success or failure, on one connection."""
+    temp_db.enqueue_job({'id': 'js1', 'command': 'echo', 'max_retries': 1})
+    temp_db.enqueue_job({'id': 'js2', 'command': 'echo', 'max_retries': 1})
+
+    with temp_db.job_session('w1') as (job, complete):
+        assert temp_db.get_job(job['id'])['state'] == 'processing'
+        complete()
+    with temp_db.job_session('w1') as (job2, complete):
+        complete('boom')
+    with temp_db.job_session('w1') as (none, _):
+        assert none is None
+
+    assert temp_db.get_job(job['id'])['state'] == 'completed'
+    assert temp_db.get_job(job2['id'])['state'] == 'dead'
+
+
+def test_next_run_at_ms_mirrors_next_run_at(temp_db):
+    """The integer due time tracks next_run_at through enqueue and retry."""
+    from datetime import datetime
+    temp_db.enqueue_job({'id': 'ms1', 'command': 'echo'})
+    temp_db.enqueue_job({'id': 'ms2', 'command': 'echo',
+                         'next_run_at': '2999-01-01T00:00:00+00:00'})
+    for job_id in ('ms1', 'ms2'):
+        j = temp_db.get_job(job_id)
+        expected = datetime.fromisoformat(j['next_run_at']).timestamp() * 1000
+        assert abs(j['next_run_at_ms'] - expected) <= 1
+
+    # Scheduled in the future, so only ms1 is due
+    assert temp_db.acquire_job('w1')['id'] == 'ms1'
+    assert temp_db.acquire_job('w1') is None
+
+
+def test_dlq_missing_job_after_other_writes(temp_db):
+    """DLQ retry/delete report misses even on a connection with earlier writes."""
+    temp_db.enqueue_job({'id': 'live', 'command': 'echo'})
+    temp_db.set_config('k', 'v')
+    assert temp_db.retry_dlq_job('live') is False
+    assert temp_db.retry_dlq_job('nope', reset_attempts=False) is False
+    assert temp_db.delete_dlq_job('live') is False
+    assert temp_db.get_job('live')['state'] == 'pending'
+
+
+def test_job_counts_include_every_state(temp_db):
+    """Counts come back for all states, in order, including empty ones."""
+    from src.storage import JOB_STATES
+    temp_db.enqueue_job({'id': 'c1', 'command': 'echo'})
+    counts = temp_db.get_job_counts()
+    assert list(counts) == list(JOB_STATES)
+    assert counts['pending'] == 1
+    assert counts['dead'] == 0
+
+
+def test_structured_error_stored_as_json(temp_db):
+    """Non-string errors are serialized once, strings pass through."""
+    from src.utils import json_loads
+    temp_db.enqueue_job({'id': 'e1', 'command': 'false', 'max_retries': 5})
+    temp_db.acquire_job('w1')
+    temp_db.update_job_failure('e1', {'exit': 1, 'stderr': 'boom'})
+    assert json_loads(temp_db.get_job('e1')['last_error']) == {'exit': 1, 'stderr': 'boom'}
+
+
+def test_wait_for_change(temp_db):
+    """wait_for_change wakes on a commit from another connection and times out otherwise."""
+    import threading
+    assert temp_db.wait_for_change(0.1) is False
+
+    writer = Storage(temp_db.db_path)
+    timer = threading.Timer(0.1, writer.enqueue_job, args=({'id': 'wk1', 'command': 'echo'},))
+    timer.start()
+    start = time.monotonic()
+    assert temp_db.wait_for_change(5.0) is True
+    assert time.monotonic() - start < 2.0
+    timer.join()
+    writer.close()
+
+    assert temp_db.wait_for_change(5.0, stop=lambda: True) is False
+
+
+def test_wait_for_change_wakes_on_signal(temp_db):
+    """With a wakeup fd, a signal ends the current sleep instead of waiting out the interval."""
+    import signal
+    import threading
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    os.set_blocking(w, False)
+    flag = []
+    old_handler = signal.signal(signal.SIGUSR1, lambda signum, frame: flag.append(signum))
+    old_fd = signal.set_wakeup_fd(w)
+    try:
+        timer = threading.Timer(0.1, os.kill, args=(os.getpid(), signal.SIGUSR1))
+        timer.start()
+        start = time.monotonic()
+        assert temp_db.wait_for_change(10.0, interval=10.0, stop=lambda: bool(flag), wakeup_fd=r) is False
+        assert time.monotonic() - start < 2.0
+        timer.join()
+    finally:
+        signal.set_wakeup_fd(old_fd)
+        signal.signal(signal.SIGUSR1, old_handler)
+        os.close(r)
+        os.close(w)
+
+
+def test_enqueue_wakes_waiter_through_fifo(temp_db):
+    """An enqueue from another Storage ends wait_for_change without waiting for a file check."""
+    import threading
+    assert temp_db.wait_for_change(0.05, interval=0.05) is False  # opens the FIFO
+    writer = Storage(temp_db.db_path)
+    timer = threading.Timer(0.1, writer.enqueue_job, args=({'id': 'fifo1', 'command': 'echo'},))
+    timer.start()
+    start = time.monotonic()
+    assert temp_db.wait_for_change(10.0, interval=10.0) is True
+    assert time.monotonic() - start < 2.0
+    timer.join()
+    writer.close()
+
+
+def test_notify_ignores_non_fifo_path(tmp_path):
+    """A regular file at the notify path is never written to and disables the FIFO."""
+    s = Storage.bootstrap(str(tmp_path / "q.db"))
+    Path(notify_path(s.db_path)).write_bytes(b'')
+    s.enqueue_job({'id': 'n1', 'command': 'echo'})
+    assert s.wait_for_change(0.05) is False
+    assert Path(notify_path(s.db_path)).read_bytes() == b''
+    s.close()
+
+
+def test_row_adapter_is_cached_per_shape():
+    """Generated row adapters map columns by position and are reused."""
+    from src.storage import _row_adapter
+    adapt = _row_adapter(('id', "it's"))
+    assert adapt(('a', 1)) == {'id': 'a', "it's": 1}
+    assert _row_adapter(('id', "it's")) is adapt
+
+
+def test_acquire_jobs_batch_and_release(temp_db):
+    """A batch claim takes the oldest due jobs; released ones are claimable again."""
+    temp_db.enqueue_jobs_bulk([{'id': f'q{i}', 'command': 'echo'} for i in range(3)])
+    jobs = temp_db.acquire_jobs('w1', 2)
+    assert len(jobs) == 2
+    assert all(j['state'] == 'processing' and j['attempts'] == 1 for j in jobs)
+
+    assert temp_db.release_jobs('w2', [jobs[1]['id']]) == 0
+    assert temp_db.release_jobs('w1', [jobs[1]['id']]) == 1
+    released = temp_db.get_job(jobs[1]['id'])
+    assert released['state'] == 'pending'
+    assert released['attempts'] == 0
+
+    assert len(temp_db.acquire_jobs('w2', 5)) == 2
+
+
+def test_acquire_on_empty_queue_skips_write_lock(temp_db):
+    """With nothing due, acquire_jobs returns without waiting for the write lock."""
+    temp_db.enqueue_job({'id': 'later', 'command': 'echo', 'next_run_at': '2999-01-01T00:00:00'})
+    writer = sqlite3.connect(temp_db.db_path)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        assert temp_db.acquire_jobs('w1', 4) == []
+        assert time.monotonic() - start < 1.0
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_bulk_job_updates(temp_db):
+    """Batched success and failure updates apply the same transitions as the single-job calls."""
+    temp_db.enqueue_jobs_bulk([
+        {'id': 'b1', 'command': 'echo'},
+        {'id': 'b2', 'command': 'echo'},
+        {'id': 'b3', 'command': 'false', 'max_retries': 1},
+        {'id': 'b4', 'command': 'false', 'max_retries': 3},
+    ])
+    jobs = {j['id']: j for j in temp_db.acquire_jobs('w1', 4)}
+    temp_db.bulk_update_success(['b1', 'b2'])
+    temp_db.bulk_update_failure([
+        (jid, 'boom', jobs[jid]['attempts'], jobs[jid]['max_retries']) for jid in ('b3', 'b4')
+    ])
+    states = {jid: temp_db.get_job(jid)['state'] for jid in jobs}
+    assert states == {'b1': 'completed', 'b2': 'completed', 'b3': 'dead', 'b4': 'failed'}
+    assert temp_db.get_job('b4')['last_error'] == 'boom'
+
+
+def _child_get_job(storage, results):
+    job = storage.get_job('forked')
+    results.put(job['state'] if job else None)
+
+
+def test_pool_reopens_connections_after_fork(temp_db):
+    """A Storage used before fork opens fresh connections in the child."""
+    import multiprocessing as mp
+    temp_db.enqueue_job({'id': 'forked', 'command': 'echo'})
+    ctx = mp.get_context('fork')
+    results = ctx.Queue()
+    p = ctx.Process(target=_child_get_job, args=(temp_db, results))
+    p.start()
+    p.join()
+    assert p.exitcode == 0
+    assert results.get(timeout=5) == 'pending'
+    assert temp_db.get_job('forked')['state'] == 'pending'
+
+
+def test_finish_job_commits_outcome_and_heartbeat_together(temp_db):
+    """finish_job updates the job and the worker heartbeat in a single commit."""
+    temp_db.register_worker('w1', 1)
+    with temp_db.get_connection() as conn:
+        conn.execute("UPDATE ephemeral.workers SET last_heartbeat = 'old'")
+        conn.commit()
+    temp_db.enqueue_job({'id': 'f1', 'command': 'echo'})
+    job = temp_db.acquire_job('w1')
+
+    commits = []
+    with temp_db.get_connection() as conn:
+        conn.set_trace_callback(lambda sql: sql == 'COMMIT' and commits.append(sql))
+    try:
+        temp_db.finish_job(job['id'], 'w1', attempts=job['attempts'], max_retries=job['max_retries'])
+    finally:
+        with temp_db.get_connection() as conn:
+            conn.set_trace_callback(None)
+
+    assert commits == ['COMMIT']
+    assert temp_db.get_job('f1')['state'] == 'completed'
+    assert temp_db.get_active_workers()[0]['last_heartbeat'] != 'old'
+
+
+def test_bulk_enqueue_claimed_in_array_order(temp_db):
+    """Jobs enqueued as one array are claimed in array order, not ID order."""
+    ids = ['zeta', 'alpha', 'mid', 'beta']
+    assert temp_db.enqueue_jobs_bulk([{'id': i, 'command': 'echo'} for i in ids])
+    assert [j['id'] for j in temp_db.acquire_jobs('w1', 4)] == ids
+
+    more = [f'n{9 - i}' for i in range(10)]
+    assert temp_db.enqueue_jobs_bulk([{'id': i, 'command': 'echo'} for i in more])
+    assert [temp_db.acquire_job('w1')['id'] for _ in more] == more
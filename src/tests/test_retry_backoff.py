@@ -39,3 +39,20 @@ def test_exponential_backoff_progression(db):
     ).total_seconds()
 
     assert round(second_delay / first_delay) == 2 or second_delay > first_delay
+
+
+def test_failed_job_retried_once_backoff_expires(db):
+    """A failed job is claimed again only after its next_run_at has passed."""
+    db.enqueue_job({'id': 'r1', 'command': 'fail', 'max_retries': 3})
+    db.acquire_job('w1')
+    db.update_job_failure('r1', "fail1", backoff_base=2)
+    assert db.get_job('r1')['state'] == 'failed'
+    assert db.acquire_job('w1') is None
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE jobs SET next_run_at_ms = 0 WHERE id = 'r1'")
+        conn.commit()
+    job = db.acquire_job('w1')
+    assert job['id'] == 'r1'
+    assert job['state'] == 'processing'
+    assert job['attempts'] == 2
@@ -2,8 +2,15 @@
 Utility functions for QueueCTL.
 """
 
+import json
 import logging
 import sys
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: pip install queuectl[fast]
+    orjson = None
 
 
 def setup_logging(level: str = 'INFO'):
@@ -26,4 +33,29 @@ def setup_logging(level: str = 'INFO'):
     )
     
     # Reduce noise from some libraries
-    logging.getLogger('urllib3').setLevel(logging.WARNING)
\ No newline at end of file
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+
+def json_loads(data) -> Any:
+    """
+    Parse JSON text or bytes, using orjson when it is installed.
+    
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, and bytes
+    that are not valid UTF-8 raise it too, so callers only need to catch
+    the stdlib exception.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError as e:
+        raise json.JSONDecodeError(f"Invalid UTF-8 ({e.reason})", '', e.start) from e
+
+
+def json_dumps(obj: Any) -> str:
+    """Serialize to compact JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
\ No newline at end of file
@@ -4,23 +4,70 @@ Handles job acquisition, execution, and graceful shutdown.
 """
 
 import multiprocessing as mp
+from collections import deque
+import random
+import selectors
 import signal
 import time
-import uuid
+import secrets
 import os
 import logging
 from typing import Optional
 from pathlib import Path
-from .storage import Storage
+from .storage import Storage, remove_notify_fifo
 from .executor import Executor
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+# Most jobs a worker claims in one acquire_jobs call
+MAX_ACQUIRE_BATCH = 16
+
+# Jobs finishing faster than this grow the claim batch; slower jobs
+# shrink it back to one so they do not hold queued work hostage
+FAST_JOB_NS = 500_000_000
+
+# Finished-job results are buffered and written in one transaction once
+# this many are pending or the oldest is this many seconds old
+RESULT_FLUSH_SIZE = 32
+RESULT_FLUSH_SECONDS = 0.5
+
+# Workers are forked so they share the manager's imported modules
+# copy-on-write instead of re-importing them; spawn where fork is missing
+_mp = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else None)
+
+# Cap on the idle backoff exponent (poll_interval * 2**MAX_SHIFT)
+MAX_SHIFT = 10
+
+
+def _write_pidfile(pidfile: Path):
+    """Write this process's PID so readers never see a partial file."""
+    tmp = pidfile.with_name(f"{pidfile.name}.tmp.{os.getpid()}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, pidfile)
+
+
+def _remove_pidfile(pidfile: Path):
+    """Remove the PID file, unless another manager has replaced it."""
+    try:
+        if pidfile.read_text().strip() == str(os.getpid()):
+            pidfile.unlink()
+    except FileNotFoundError:
+        pass
+
 
 class Worker:
     """Individual worker process that executes jobs."""
     
+    # Characters of stderr stored as last_error, and shown in the log
+    ERROR_TRIM = 500
+    LOG_TRIM = 200
+    
     def __init__(self, worker_id: str, db_path: str, backoff_base: int, job_limit: Optional[int] = None):
         self.worker_id = worker_id
         self.db_path = db_path
@@ -28,15 +75,138 @@ class Worker:
         self.job_limit = job_limit
         self.shutdown_requested = False
         self.jobs_processed = 0
+        # Jobs left before job_limit is reached (unbounded without one)
+        self._remaining = job_limit if job_limit else float('inf')
+        # Log prefix, formatted once
+        self._tag = f"Worker {worker_id}"
+        # Jobs claimed but not yet started, and the next claim size
+        self._local_queue = deque()
+        self._batch_size = 1
+        # Consecutive empty polls; seeded per worker so idle workers
+        # drift apart instead of polling in lockstep
+        self._idle_rounds = 0
+        self._rng = random.Random(worker_id)
+        # Monotonic time of the last heartbeat write
+        self._last_hb = 0.0
+        # Results not yet written, and when the oldest was buffered
+        self._pending_success = []
+        self._pending_failure = []
+        self._pending_since = 0.0
+        # Set by SIGHUP; settings are re-read at the top of the loop
+        self._reload_requested = False
+    
+    def _next_job(self, storage: Storage):
+        """Pop the next claimed job, claiming a new batch when none are left."""
+        if not self._local_queue:
+            n = min(self._batch_size, self._remaining)
+            self._local_queue.extend(storage.acquire_jobs(self.worker_id, n))
+        return self._local_queue.popleft() if self._local_queue else None
+    
+    def _adapt_batch_size(self, elapsed_ns: int):
+        """Grow the claim batch while jobs are quick, reset it on a slow one."""
+        if elapsed_ns < FAST_JOB_NS:
+            self._batch_size = min(self._batch_size * 2, MAX_ACQUIRE_BATCH)
+        else:
+            self._batch_size = 1
+    
+    def _idle_delay(self, poll_interval: float, poll_max: float) -> float:
+        """Full-jitter exponential backoff for the next empty poll."""
+        self._idle_rounds = min(self._idle_rounds + 1, MAX_SHIFT)
+        return self._rng.uniform(0, min(poll_max, poll_interval * (1 << self._idle_rounds)))
+    
+    def _buffer_result(self, job, result, now: float) -> str:
+        """
+        Queue a finished job's outcome for the next flush.
+        
+        Returns:
+            The first ERROR_TRIM characters of stderr ('' on success or
+            when the job wrote no stderr)
+        """
+        if not (self._pending_success or self._pending_failure):
+            self._pending_since = now
+        if result.returncode == 0:
+            self._pending_success.append(job['id'])
+            return ''
+        err_head = result.stderr[:self.ERROR_TRIM]
+        error_msg = err_head or f"Exit code: {result.returncode}"
+        self._pending_failure.append((job['id'], error_msg, job['attempts'], job['max_retries']))
+        return err_head
+    
+    def _flush_results(self, storage: Storage, now: Optional[float] = None):
+        """
+        Write all buffered job outcomes in one transaction.
+        
+        Given the current monotonic time, a heartbeat that is due is
+        written in the same commit.
+        """
+        if not (self._pending_success or self._pending_failure):
+            return
+        heartbeat = now is not None and now - self._last_hb >= self._heartbeat_interval
+        with storage.batch():
+            storage.bulk_update_success(self._pending_success)
+            storage.bulk_update_failure(self._pending_failure, self.backoff_base)
+            if heartbeat:
+                storage.update_worker_heartbeat(self.worker_id)
+        if heartbeat:
+            self._last_hb = now
+        self._pending_success = []
+        self._pending_failure = []
+    
+    def _flush_delay(self, storage: Storage) -> Optional[float]:
+        """
+        Seconds until the buffered results are due to be written.
+        
+        Results already due are flushed right away.
+        
+        Returns:
+            The delay, or None when nothing is left buffered
+        """
+        if not (self._pending_success or self._pending_failure):
+            return None
+        now = time.monotonic()
+        delay = self._pending_since + RESULT_FLUSH_SECONDS - now
+        if delay > 0:
+            return delay
+        self._flush_results(storage, now)
+        return None
+    
+    def _load_settings(self, config: Config):
+        """Snapshot the settings read inside the main loop and rebuild the executor."""
+        self._poll_interval = config.get_float('poll_interval', 1.0)
+        self._poll_max = config.get_float('poll_max', 5.0)
+        self._heartbeat_interval = config.get_float('heartbeat_interval', 10.0)
+        self._executor = Executor(log_dir=config.get('log_dir') or None)
+    
+    def _maybe_heartbeat(self, storage: Storage, now: float, interval: float):
+        """Write a heartbeat if the last one is at least interval seconds old."""
+        if now - self._last_hb >= interval:
+            storage.update_worker_heartbeat(self.worker_id)
+            self._last_hb = now
     
     def setup_signal_handlers(self):
         """Setup graceful shutdown handlers."""
         def shutdown_handler(signum, frame):
-            logger.info(f"Worker {self.worker_id}: Shutdown signal received")
+            logger.info("%s: Shutdown signal received", self._tag)
             self.shutdown_requested = True
         
+        def reload_handler(signum, frame):
+            self._reload_requested = True
+        
         signal.signal(signal.SIGTERM, shutdown_handler)
         signal.signal(signal.SIGINT, shutdown_handler)
+        signal.signal(signal.SIGHUP, reload_handler)
+        
+        # Signals also write a byte to this pipe, waking the idle wait
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self._prev_wakeup_fd = signal.set_wakeup_fd(self._wakeup_w)
+    
+    def _close_wakeup_pipe(self):
+        """Restore the previous signal wakeup fd and close the self-pipe."""
+        signal.set_wakeup_fd(self._prev_wakeup_fd)
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
     
     def run(self):
         """Main worker loop."""
@@ -44,64 +214,109 @@ class Worker:
         
         storage = Storage(self.db_path)
         config = Config(storage)
-        executor = Executor()
+        self._load_settings(config)
         
         # Register worker
         storage.register_worker(self.worker_id, os.getpid())
-        logger.info(f"Worker {self.worker_id} started (PID: {os.getpid()})")
+        self._last_hb = time.monotonic()
+        logger.info("%s started (PID: %d)", self._tag, os.getpid())
         
         try:
-            while not self.shutdown_requested:
-                # Check job limit
-                if self.job_limit and self.jobs_processed >= self.job_limit:
-                    logger.info(f"Worker {self.worker_id}: Job limit reached ({self.job_limit})")
-                    break
+            while self._remaining > 0 and not self.shutdown_requested:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    config.reload()
+                    self._load_settings(config)
+                    logger.info("%s: Configuration reloaded", self._tag)
                 
                 # Acquire next job
-                job = storage.acquire_job(self.worker_id)
+                job = self._next_job(storage)
                 
                 if job:
-                    logger.info(f"Worker {self.worker_id}: Processing job {job['id']}")
-                    logger.info(f"  Command: {job['command']}")
-                    logger.info(f"  Attempt: {job['attempts']}/{job['max_retries']}")
+                    self._idle_rounds = 0
+                    log_info = logger.isEnabledFor(logging.INFO)
+                    if log_info:
+                        logger.info("%s: Processing job %s", self._tag, job['id'])
+                        logger.info("  Command: %s", job['command'])
+                        logger.info("  Attempt: %d/%d", job['attempts'], job['max_retries'])
                     
-                    # Execute the job
-                    start_time = time.time()
-                    result = executor.execute(job['command'])
-                    elapsed = time.time() - start_time
+                    # Results still buffered are written before this job
+                    # starts if they are due, else once it has run until
+                    # they are, so a slow job never holds them back
+                    flush_in = self._flush_delay(storage)
                     
-                    logger.info(f"  Exit code: {result.returncode}")
-                    logger.info(f"  Duration: {elapsed:.2f}s")
+                    # Execute the job; the executor times it with monotonic_ns
+                    shell = job.get('shell')
+                    result = self._executor.execute(
+                        job['command'],
+                        shell=None if shell is None else bool(shell),
+                        log_name=f"{job['id']}.{job['attempts']}",
+                        on_slow=None if flush_in is None else lambda: self._flush_results(storage, time.monotonic()),
+                        slow_after=flush_in or 0.0
+                    )
+                    now = time.monotonic()
+                    elapsed_ns = result.duration_ns
+                    self._adapt_batch_size(elapsed_ns)
                     
-                    # Update job based on result
+                    if log_info:
+                        logger.info("  Exit code: %d", result.returncode)
+                        logger.info("  Duration: %d ms", elapsed_ns // 1_000_000)
+                        if result.stdout_path:
+                            logger.info("  Logs: %s, %s", result.stdout_path, result.stderr_path)
+                    
+                    # Update job based on result; quick jobs are written
+                    # in batches, a slow one flushes right away
+                    err_head = self._buffer_result(job, result, now)
                     if result.returncode == 0:
-                        storage.update_job_success(job['id'])
-                        logger.info(f"Worker {self.worker_id}: Job {job['id']} completed successfully")
+                        logger.info("%s: Job %s completed successfully", self._tag, job['id'])
                     else:
-                        error_msg = result.stderr[:500] if result.stderr else f"Exit code: {result.returncode}"
-                        storage.update_job_failure(job['id'], error_msg, self.backoff_base)
-                        logger.warning(f"Worker {self.worker_id}: Job {job['id']} failed")
-                        if result.stderr:
-                            logger.warning(f"  Error: {result.stderr[:200]}")
+                        logger.warning("%s: Job %s failed", self._tag, job['id'])
+                        if err_head:
+                            logger.warning("  Error: %s", err_head[:self.LOG_TRIM])
                     
-                    self.jobs_processed += 1
+                    # A due heartbeat also flushes, riding in the same commit
+                    if (elapsed_ns >= FAST_JOB_NS
+                            or len(self._pending_success) + len(self._pending_failure) >= RESULT_FLUSH_SIZE
+                            or now - self._pending_since >= RESULT_FLUSH_SECONDS
+                            or now - self._last_hb >= self._heartbeat_interval):
+                        self._flush_results(storage, now)
                     
-                    # Update heartbeat
-                    storage.update_worker_heartbeat(self.worker_id)
+                    self.jobs_processed += 1
+                    self._remaining -= 1
                 else:
-                    # No jobs available, sleep briefly
-                    poll_interval = config.get_float('poll_interval', 1.0)
-                    time.sleep(poll_interval)
+                    self._flush_results(storage, time.monotonic())
+                    
+                    # No jobs available: sleep until something is committed.
+                    # A failed job becoming due commits nothing, so also
+                    # re-check after a jittered, growing delay for retries
+                    storage.wait_for_change(
+                        self._idle_delay(self._poll_interval, self._poll_max),
+                        stop=lambda: self.shutdown_requested or self._reload_requested,
+                        wakeup_fd=self._wakeup_r
+                    )
                     
                     # Update heartbeat
-                    storage.update_worker_heartbeat(self.worker_id)
+                    self._maybe_heartbeat(storage, time.monotonic(), self._heartbeat_interval)
+            
+            if self._remaining <= 0:
+                logger.info("%s: Job limit reached (%d)", self._tag, self.job_limit)
         
         except Exception as e:
-            logger.error(f"Worker {self.worker_id}: Fatal error: {e}", exc_info=True)
+            logger.error("%s: Fatal error: %s", self._tag, e, exc_info=True)
         finally:
+            # Write outcomes of jobs that already ran
+            self._flush_results(storage)
+            
+            # Hand back jobs claimed but never started
+            if self._local_queue:
+                storage.release_jobs(self.worker_id, [job['id'] for job in self._local_queue])
+                self._local_queue.clear()
+            
             # Unregister worker
             storage.unregister_worker(self.worker_id)
-            logger.info(f"Worker {self.worker_id}: Stopped (processed {self.jobs_processed} jobs)")
+            storage.close()
+            self._close_wakeup_pipe()
+            logger.info("%s: Stopped (processed %d jobs)", self._tag, self.jobs_processed)
 
 
 class WorkerManager:
@@ -122,8 +337,15 @@ class WorkerManager:
             self.shutdown_requested = True
             self.stop()
         
+        def reload_handler(signum, frame):
+            # Pass configuration reloads on to the workers
+            for process in self.processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGHUP)
+        
         signal.signal(signal.SIGTERM, shutdown_handler)
         signal.signal(signal.SIGINT, shutdown_handler)
+        signal.signal(signal.SIGHUP, reload_handler)
     
     def start(self):
         """Start worker processes."""
@@ -131,37 +353,78 @@ class WorkerManager:
         
         # Write PID file for worker stop command
         pidfile = Path('.queuectl.pid')
-        with open(pidfile, 'w') as f:
-            f.write(str(os.getpid()))
+        _write_pidfile(pidfile)
         
-        # Recover any abandoned jobs
-        storage = Storage(self.db_path)
+        # Create the schema once here; workers open the database as-is
+        storage = Storage.bootstrap(self.db_path)
         config = Config(storage)
+        
+        # Recover any abandoned jobs
         abandoned_threshold = config.get_int('abandoned_threshold', 3600)
         storage.recover_abandoned_jobs(abandoned_threshold)
         
+        # Optionally pin worker i to the i-th allowed CPU (round-robin).
+        # Commands a worker runs inherit its affinity, so this is opt-in.
+        cpus = None
+        if config.get_bool('worker_cpu_affinity', False) and hasattr(os, 'sched_setaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+        storage.close()
+        
         # Start worker processes
         for i in range(self.worker_count):
-            worker_id = f"worker-{uuid.uuid4().hex[:8]}"
-            process = mp.Process(
+            # Index for readability, random suffix to tell restarts apart
+            worker_id = f"worker-{i:04d}-{secrets.token_hex(3)}"
+            cpu = cpus[i % len(cpus)] if cpus else None
+            process = _mp.Process(
                 target=self._run_worker,
-                args=(worker_id,)
+                args=(worker_id, cpu)
             )
             process.start()
             self.processes.append(process)
-            logger.info(f"Started worker process: {worker_id} (PID: {process.pid})")
+            logger.info("Started worker process: %s (PID: %d)", worker_id, process.pid)
         
         try:
-            # Wait for all processes to complete
-            for process in self.processes:
-                process.join()
+            self._wait_for_workers()
         finally:
-            # Clean up PID file
-            if pidfile.exists():
-                pidfile.unlink()
+            # Clean up PID file, and the FIFO the workers listened on
+            _remove_pidfile(pidfile)
+            remove_notify_fifo(self.db_path)
     
-    def _run_worker(self, worker_id: str):
+    def _wait_for_workers(self, timeout: Optional[float] = None) -> list:
+        """
+        Wait until every worker process has exited, reaping each as it exits.
+        
+        Args:
+            timeout: Overall seconds to wait (optional, default no limit)
+        
+        Returns:
+            Processes still running when the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with selectors.DefaultSelector() as sel:
+            for process in self.processes:
+                if process.exitcode is None:
+                    sel.register(process.sentinel, selectors.EVENT_READ, process)
+            
+            while sel.get_map():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                for key, _ in sel.select(remaining):
+                    process = key.data
+                    sel.unregister(key.fileobj)
+                    process.join()
+                    if process.exitcode:
+                        logger.warning("Worker process %d exited with code %d", process.pid, process.exitcode)
+            
+            return [key.data for key in sel.get_map().values()]
+    
+    def _run_worker(self, worker_id: str, cpu: Optional[int] = None):
         """Run a single worker (called in subprocess)."""
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
         worker = Worker(worker_id, self.db_path, self.backoff_base, self.job_limit)
         worker.run()
     
@@ -173,12 +436,10 @@ class WorkerManager:
             if process.is_alive():
                 process.terminate()
         
-        # Wait for graceful shutdown
-        timeout = 30
-        for process in self.processes:
-            process.join(timeout=timeout)
-            if process.is_alive():
-                logger.warning(f"Worker {process.pid} did not stop gracefully, forcing...")
-                process.kill()
+        # Wait for graceful shutdown, 30s in total rather than per worker
+        for process in self._wait_for_workers(timeout=30):
+            logger.warning("Worker %d did not stop gracefully, forcing...", process.pid)
+            process.kill()
+            process.join(timeout=5)
         
         logger.info("All workers stopped")
\ No newline at end of file